@@ -0,0 +1,102 @@
+"""Compare the in-place event decoder against the original cffi copying decoder.
+
+Run from an installed (or built in place) checkout::
+
+    python benchmarks/decode_benchmark.py
+"""
+
+import argparse
+import timeit
+from typing import List
+
+from trio_inotify.inotify import (
+    INOTIFY_EVENT_HEADER,
+    InotifyEvent,
+    InotifyMasks,
+    WatchManager,
+    Watcher,
+    inotify_ffi,
+)
+
+
+def build_event_buffer(event_count: int) -> bytes:
+    """Build a buffer laid out the way the kernel returns inotify events.
+
+    :param int event_count: Number of events to pack.
+    :return bytes: Packed events, names NUL padded to 16 byte boundaries.
+    """
+    events = []
+    for i in range(event_count):
+        name = "file_{}.log".format(i).encode("utf-8")
+        padded_length = (len(name) // 16 + 1) * 16
+        events.append(
+            INOTIFY_EVENT_HEADER.pack(
+                i % 64 + 1,
+                InotifyMasks.IN_MODIFY.value,
+                0,
+                padded_length,
+            )
+            + name.ljust(padded_length, b"\0")
+        )
+    return b"".join(events)
+
+
+def cffi_unpack_inotify_event(
+    watcher: Watcher, new_inotify_event
+) -> List[InotifyEvent]:
+    """The original decoder, copying the read into a cffi buffer and slicing it per event."""
+    inotify_events: List[InotifyEvent] = []
+    event_struct_size: int = inotify_ffi.sizeof("struct inotify_event")
+    string_buffer = inotify_ffi.new("char[]", len(new_inotify_event))
+    string_buffer[0 : len(new_inotify_event)] = new_inotify_event
+    i = 0
+    while i < len(string_buffer):
+        inotify_event = inotify_ffi.cast(
+            "struct inotify_event *", string_buffer[i : i + event_struct_size]
+        )
+        file_name_start = i + event_struct_size
+        file_name_end = file_name_start + inotify_event.len
+        file_name = inotify_ffi.string(string_buffer[file_name_start:file_name_end])
+        inotify_events.append(
+            InotifyEvent(
+                inotify_event.wd,
+                watcher.watch_manager.inotify_event_flags(inotify_event.mask),
+                inotify_event.cookie,
+                file_name,
+            )
+        )
+        i += event_struct_size + inotify_event.len
+    return inotify_events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=10)
+    args = parser.parse_args()
+
+    watcher = Watcher(watch_manager=WatchManager())
+    event_buffer = build_event_buffer(args.events)
+
+    assert cffi_unpack_inotify_event(
+        watcher, event_buffer
+    ) == watcher._unpack_inotify_event(event_buffer)
+
+    results = {}
+    for name, decoder in (
+        ("cffi copy", lambda: cffi_unpack_inotify_event(watcher, event_buffer)),
+        ("in place", lambda: watcher._unpack_inotify_event(event_buffer)),
+    ):
+        best = min(timeit.repeat(decoder, repeat=args.repeat, number=args.number))
+        results[name] = best / args.number
+        print(
+            "{:>10}: {:8.2f} ms per {} events".format(
+                name, results[name] * 1000, args.events
+            )
+        )
+    print("   speedup: {:.2f}x".format(results["cffi copy"] / results["in place"]))
+
+
+if __name__ == "__main__":
+    main()
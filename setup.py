@@ -14,7 +14,8 @@ setup(
     python_requires="~=3.6",
     setup_requires=["cffi"],
     cffi_modules=["src/build/inotify.py:ffi", "src/build/ioctl.py:ffi"],
-    install_requires=["trio >=0.11.0", "attrs", "cffi"],
+    install_requires=["trio >=0.15.0", "attrs", "cffi"],
+    extras_require={"numpy": ["numpy"]},
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
         "Intended Audience :: Developers",
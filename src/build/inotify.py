@@ -62,11 +62,37 @@ int inotify_init(void);
 int inotify_init1(int flags);
 int inotify_add_watch(int fd, const char *pathname, uint32_t mask);
 int inotify_rm_watch(int fd, int wd);
+
+/*
+ * Add the same watch mask to count NUL terminated paths packed back to back
+ * in pathnames.  wds and errnos receive the result of each inotify_add_watch.
+ * Returns the number of paths that failed.
+ */
+size_t inotify_add_watches(int fd, const char *pathnames, size_t count,
+                           uint32_t mask, int *wds, int *errnos);
 """)
 
 ffi.set_source("trio_inotify._inotify_c", """
+#include <errno.h>
+#include <string.h>
 #include <sys/inotify.h>
 #include <sys/ioctl.h>
+
+static size_t inotify_add_watches(int fd, const char *pathnames, size_t count,
+                                  uint32_t mask, int *wds, int *errnos)
+{
+    size_t failed = 0;
+    size_t i;
+
+    for (i = 0; i < count; i++) {
+        wds[i] = inotify_add_watch(fd, pathnames, mask);
+        errnos[i] = wds[i] < 0 ? errno : 0;
+        if (wds[i] < 0)
+            failed++;
+        pathnames += strlen(pathnames) + 1;
+    }
+    return failed;
+}
 """, libraries=[])
 
 if __name__ == "__main__":
@@ -5,7 +5,7 @@ from trio_inotify._inotify_c import ffi, lib
 
 def handle_errors(ffi_error):
     if ffi_error in errno.errorcode.keys():
-        raise OSError(strerror(ffi_error))
+        raise OSError(ffi_error, strerror(ffi_error))
     else:
         raise Exception("Unknown error occurred")
 
@@ -28,6 +28,26 @@ def inotify_add_watch(inotify_fd, path, watch_mask):
     return watch_descriptor
 
 
+def inotify_add_watches(inotify_fd, paths, watch_mask):
+    """Add the same watch to many ``bytes`` paths with one call into C.
+
+    Returns per path watch descriptors and errnos, -1 and 0 respectively where not applicable.
+    """
+    count = len(paths)
+    watch_descriptors = ffi.new("int[]", count)
+    errnos = ffi.new("int[]", count)
+    if count:
+        lib.inotify_add_watches(
+            inotify_fd,
+            b"\0".join(paths) + b"\0",
+            count,
+            watch_mask,
+            watch_descriptors,
+            errnos,
+        )
+    return list(watch_descriptors), list(errnos)
+
+
 def inotify_rm_watch(inotify_fd, watch_descriptor):
     rm_result = lib.inotify_rm_watch(inotify_fd, watch_descriptor)
 
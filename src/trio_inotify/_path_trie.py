@@ -0,0 +1,178 @@
+"""Mapping keyed by absolute path, answering subtree and prefix queries in memory
+"""
+from collections.abc import MutableMapping
+from typing import Any, Iterator, List, Optional, Tuple
+
+_MISSING = object()
+
+
+class _PathTrieNode:
+    __slots__ = ("children", "path", "value", "size")
+
+    def __init__(self):
+        self.children = {}
+        self.path = None
+        self.value = _MISSING
+        # Number of values stored at or below this node.
+        self.size = 0
+
+
+def _path_components(path: str) -> List[str]:
+    return [component for component in path.split("/") if component]
+
+
+class PathTrie(MutableMapping):
+    """``dict`` like mapping of absolute paths, stored as a trie of path components.
+
+    On top of the usual mapping operations, finding every key below a path, the nearest key
+    above a path and counting keys below a path cost O(path depth + matches) without touching
+    the filesystem.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._root = _PathTrieNode()
+        self.update(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return "{}({!r})".format(type(self).__name__, dict(self.items()))
+
+    def _find_node(self, path: str) -> Optional[_PathTrieNode]:
+        node = self._root
+        for component in _path_components(path):
+            node = node.children.get(component)
+            if node is None:
+                return None
+        return node
+
+    def __getitem__(self, path: str) -> Any:
+        node = self._find_node(path)
+        if node is None or node.value is _MISSING:
+            raise KeyError(path)
+        return node.value
+
+    def __setitem__(self, path: str, value: Any) -> None:
+        nodes = [self._root]
+        for component in _path_components(path):
+            node = nodes[-1].children.get(component)
+            if node is None:
+                node = nodes[-1].children[component] = _PathTrieNode()
+            nodes.append(node)
+        node = nodes[-1]
+        if node.value is _MISSING:
+            for ancestor in nodes:
+                ancestor.size += 1
+        node.path = path
+        node.value = value
+
+    def __delitem__(self, path: str) -> None:
+        nodes = [(None, self._root)]
+        for component in _path_components(path):
+            node = nodes[-1][1].children.get(component)
+            if node is None:
+                raise KeyError(path)
+            nodes.append((component, node))
+        if nodes[-1][1].value is _MISSING:
+            raise KeyError(path)
+        nodes[-1][1].value = _MISSING
+        nodes[-1][1].path = None
+        for _, node in nodes:
+            node.size -= 1
+        # Prune nodes left holding nothing.
+        for (component, node), (_, parent) in zip(
+            reversed(nodes), reversed(nodes[:-1])
+        ):
+            if node.size:
+                break
+            del parent.children[component]
+
+    def __contains__(self, path: object) -> bool:
+        if not isinstance(path, str):
+            return False
+        node = self._find_node(path)
+        return node is not None and node.value is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        for path, _ in self._iter_items(self._root):
+            yield path
+
+    def __len__(self) -> int:
+        return self._root.size
+
+    def clear(self) -> None:
+        self._root = _PathTrieNode()
+
+    @staticmethod
+    def _iter_items(node: _PathTrieNode) -> Iterator[Tuple[str, Any]]:
+        pending = [node]
+        while pending:
+            node = pending.pop()
+            if node.value is not _MISSING:
+                yield node.path, node.value
+            pending.extend(node.children.values())
+
+    def subtree_items(
+        self, path: str, include_self: bool = True
+    ) -> List[Tuple[str, Any]]:
+        """Every key at or below ``path`` with its value.
+
+        :param str path: Absolute path.
+        :param bool include_self: Include ``path`` itself if it is a key.
+        :return list: ``(path, value)`` pairs.
+        """
+        node = self._find_node(path)
+        if node is None:
+            return []
+        items = list(self._iter_items(node))
+        if not include_self and node.value is not _MISSING:
+            # The starting node is always yielded first.
+            del items[0]
+        return items
+
+    def subtree_size(self, path: str) -> int:
+        """Count the keys at or below ``path``.
+
+        :param str path: Absolute path.
+        :return int: Number of keys.
+        """
+        node = self._find_node(path)
+        return 0 if node is None else node.size
+
+    def prefix_items(
+        self, path: str, include_self: bool = True
+    ) -> List[Tuple[str, Any]]:
+        """Every key that is ``path`` or one of its ancestors, shallowest first.
+
+        :param str path: Absolute path.
+        :param bool include_self: Include ``path`` itself if it is a key.
+        :return list: ``(path, value)`` pairs.
+        """
+        node = self._root
+        items = [] if node.value is _MISSING else [(node.path, node.value)]
+        components = _path_components(path)
+        if not include_self:
+            if not components:
+                return []
+            components.pop()
+        for component in components:
+            node = node.children.get(component)
+            if node is None:
+                break
+            if node.value is not _MISSING:
+                items.append((node.path, node.value))
+        return items
+
+    def longest_prefix_item(self, path: str) -> Optional[Tuple[str, Any]]:
+        """Find the deepest key that is ``path`` or one of its ancestors.
+
+        :param str path: Absolute path.
+        :return tuple: ``(path, value)`` of that key, ``None`` if there is none.
+        """
+        node = self._root
+        found = None if node.value is _MISSING else (node.path, node.value)
+        for component in _path_components(path):
+            node = node.children.get(component)
+            if node is None:
+                break
+            if node.value is not _MISSING:
+                found = (node.path, node.value)
+        return found
@@ -0,0 +1,147 @@
+"""Share one Watcher's events between several consuming tasks
+"""
+import attr
+import trio
+from enum import Enum
+from typing import AsyncIterator, List, Optional, Union
+from trio_inotify.inotify import InotifyEvent, MoveEvent, OverflowEvent, Watcher
+
+
+class SlowSubscriberPolicy(Enum):
+    """What an :py:class:`EventBroadcaster` does when a subscriber's buffer is full."""
+
+    #: Drop the event for that subscriber only, counting it in ``Subscription.dropped``.
+    DROP = "drop"
+    #: Wait for the subscriber to make room, holding up every other subscriber meanwhile.
+    BLOCK = "block"
+    #: Close the subscriber's channel, its ``async for`` loop ends.
+    DISCONNECT = "disconnect"
+
+
+@attr.s(auto_attribs=True)
+class Subscription:
+    """One consumer of an :py:class:`EventBroadcaster`, iterate over it to receive events.
+
+    Events are shared between subscribers, so should not be modified.
+
+    :ivar trio.MemoryReceiveChannel receive_channel: Channel events are delivered to.
+    :ivar SlowSubscriberPolicy policy: What happens when the channel's buffer is full.
+    :ivar int dropped: Events dropped because the buffer was full.
+    :ivar bool disconnected: The broadcaster stopped delivering to this subscriber.
+    """
+
+    receive_channel: trio.abc.ReceiveChannel = attr.ib()
+    _send_channel: trio.abc.SendChannel = attr.ib(repr=False)
+    policy: SlowSubscriberPolicy = attr.ib()
+    dropped: int = attr.ib(init=False, default=0)
+    disconnected: bool = attr.ib(init=False, default=False)
+
+    def __aiter__(self) -> AsyncIterator[Union[InotifyEvent, MoveEvent, OverflowEvent]]:
+        return self.receive_channel.__aiter__()
+
+    async def aclose(self) -> None:
+        """Stop receiving events.
+
+        :return: None
+        """
+        await self.receive_channel.aclose()
+
+    def _disconnect(self) -> None:
+        self.disconnected = True
+        self._send_channel.close()
+
+    async def _send(self, inotify_event) -> None:
+        """Deliver an event according to ``policy``.
+
+        :param InotifyEvent inotify_event: Any event.
+        :return: None
+        """
+        try:
+            if self.policy is SlowSubscriberPolicy.BLOCK:
+                await self._send_channel.send(inotify_event)
+                return
+            try:
+                self._send_channel.send_nowait(inotify_event)
+            except trio.WouldBlock:
+                if self.policy is SlowSubscriberPolicy.DROP:
+                    self.dropped += 1
+                else:
+                    self._disconnect()
+        except (trio.BrokenResourceError, trio.ClosedResourceError):
+            # The subscriber closed its end.
+            self._disconnect()
+
+
+@attr.s(auto_attribs=True)
+class EventBroadcaster:
+    """Read events from a :py:class:`Watcher` once and deliver each to every subscriber.
+
+    Every subscriber gets its own memory channel buffering up to ``buffer_size`` events, what
+    happens once it is full is decided per subscriber by a :py:class:`SlowSubscriberPolicy`::
+
+        broadcaster = EventBroadcaster(watcher)
+        indexer = broadcaster.subscribe()
+        audit_log = broadcaster.subscribe(policy=SlowSubscriberPolicy.DROP)
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(broadcaster.run)
+            nursery.start_soon(index_events, indexer)
+            nursery.start_soon(log_events, audit_log)
+
+    :ivar Watcher watcher: Source of events, not to be read from anywhere else.
+    :ivar int buffer_size: Default number of events buffered per subscriber.
+    :ivar SlowSubscriberPolicy policy: Default policy for subscribers.
+    """
+
+    watcher: Watcher = attr.ib()
+    buffer_size: int = attr.ib(default=1024)
+    policy: SlowSubscriberPolicy = attr.ib(
+        default=SlowSubscriberPolicy.BLOCK, converter=SlowSubscriberPolicy
+    )
+    subscriptions: List[Subscription] = attr.ib(init=False, factory=list)
+
+    def subscribe(
+        self,
+        buffer_size: Optional[int] = None,
+        policy: Union[SlowSubscriberPolicy, str, None] = None,
+    ) -> Subscription:
+        """Add a subscriber, receiving every event read from now on.
+
+        :param int buffer_size: Events buffered for this subscriber, defaults to ``buffer_size``.
+        :param SlowSubscriberPolicy policy: Policy for this subscriber, defaults to ``policy``.
+        :return Subscription: Iterate over it to receive events.
+        """
+        send_channel, receive_channel = trio.open_memory_channel(
+            self.buffer_size if buffer_size is None else buffer_size
+        )
+        subscription = Subscription(
+            receive_channel,
+            send_channel,
+            self.policy if policy is None else SlowSubscriberPolicy(policy),
+        )
+        self.subscriptions.append(subscription)
+        return subscription
+
+    async def run(self) -> None:
+        """Deliver events to subscribers until cancelled, closing their channels on exit.
+
+        Each read is decoded once, see :py:meth:`Watcher.get_inotify_event`.
+
+        :return: None
+        """
+        try:
+            while True:
+                inotify_events = await self.watcher.get_inotify_event()
+                for inotify_event in inotify_events:
+                    for subscription in self.subscriptions:
+                        await subscription._send(inotify_event)
+                if any(
+                    subscription.disconnected for subscription in self.subscriptions
+                ):
+                    self.subscriptions = [
+                        subscription
+                        for subscription in self.subscriptions
+                        if not subscription.disconnected
+                    ]
+        finally:
+            for subscription in self.subscriptions:
+                subscription._disconnect()
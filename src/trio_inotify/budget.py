@@ -0,0 +1,678 @@
+"""Share out the per user inotify watch limit, by priority
+"""
+import errno
+import os
+import time
+import attr
+import trio
+from typing import Iterable, List, Optional, Tuple
+from trio_inotify._inotify_bridge import lib as inotify_lib
+from trio_inotify._path_trie import PathTrie
+from trio_inotify.inotify import (
+    InotifyEvent,
+    InotifyMasks,
+    RECURSIVE_WATCH_MASK,
+    RecursiveWatch,
+    WatchManager,
+    _is_within,
+)
+from trio_inotify.snapshot import DirectorySnapshot, take_snapshot
+
+MAX_USER_WATCHES_PATH = "/proc/sys/fs/inotify/max_user_watches"
+DEFAULT_MAX_USER_WATCHES = 8192
+
+
+def max_user_watches() -> int:
+    """Read the per user inotify watch limit from procfs.
+
+    :return int: Value of ``fs.inotify.max_user_watches``, or the old kernel default if
+        unreadable.
+    """
+    try:
+        with open(MAX_USER_WATCHES_PATH) as max_user_watches_file:
+            return int(max_user_watches_file.read())
+    except (OSError, ValueError):
+        return DEFAULT_MAX_USER_WATCHES
+
+
+def inotify_watch_usage() -> int:
+    """Count the inotify watches held by this user's processes, as far as procfs shows them.
+
+    Every watch shows up as an ``inotify wd:`` line in the ``fdinfo`` of its inotify file
+    descriptor.  Processes that cannot be inspected are skipped, so this may undercount.
+
+    :return int: Number of watches found.
+    """
+    uid: int = os.getuid()
+    usage = 0
+    try:
+        process_entries = list(os.scandir("/proc"))
+    except OSError:
+        return 0
+    for process_entry in process_entries:
+        if not process_entry.name.isdigit():
+            continue
+        try:
+            if process_entry.stat().st_uid != uid:
+                continue
+            fdinfo_entries = list(
+                os.scandir(os.path.join(process_entry.path, "fdinfo"))
+            )
+        except OSError:
+            continue
+        for fdinfo_entry in fdinfo_entries:
+            try:
+                with open(fdinfo_entry.path, "rb") as fdinfo_file:
+                    usage += fdinfo_file.read().count(b"\ninotify wd:")
+            except OSError:
+                continue
+    return usage
+
+
+def _tree_directories(
+    path: str, recursive_watch: Optional[RecursiveWatch] = None
+) -> List[str]:
+    """List the directories a watch on ``path`` would cover, pruned like the watch would be.
+
+    :param str path: Absolute path of a file/directory.
+    :param RecursiveWatch recursive_watch: Settings of a recursive watch, ``None`` for a watch
+        on ``path`` alone.
+    :return list: ``path`` followed by its watched subdirectories.
+    """
+    directories: List[str] = [path]
+    if recursive_watch is None:
+        return directories
+    pending: List[str] = [path]
+    while pending:
+        try:
+            directory_entries = list(os.scandir(pending.pop()))
+        except OSError:
+            continue
+        for directory_entry in directory_entries:
+            if directory_entry.is_dir(
+                follow_symlinks=False
+            ) and not recursive_watch.prunes(path, directory_entry.path):
+                directories.append(directory_entry.path)
+                pending.append(directory_entry.path)
+    return directories
+
+
+def _polled_directories(budgeted_watches: List["BudgetedWatch"]) -> List[str]:
+    """List the directories covered by any of several watches, scanning the filesystem.
+
+    :param list budgeted_watches: Watches about to be polled.
+    :return list: Absolute paths, without duplicates.
+    """
+    return list(
+        dict.fromkeys(
+            directory
+            for budgeted_watch in budgeted_watches
+            for directory in budgeted_watch.directories()
+        )
+    )
+
+
+@attr.s(auto_attribs=True)
+class BudgetedWatch:
+    """A watch added through a :py:class:`WatchBudget`.
+
+    :ivar WatchManager watch_manager: Manager holding the watch.
+    :ivar str path: Absolute path of the watched file/directory.
+    :ivar int priority: Watches of lower priority make way for it when watches run out.
+    :ivar InotifyMasks event_mask: inotify events watched for.
+    :ivar RecursiveWatch recursive_watch: Settings if the watch is recursive, else ``None``.
+    :ivar float last_activity: ``time.monotonic()`` of its latest event, see
+        :py:meth:`WatchBudget.record_activity`.
+    :ivar bool polling: Degraded to polling, no kernel watches are held.
+    """
+
+    watch_manager: WatchManager = attr.ib()
+    path: str = attr.ib()
+    priority: int = attr.ib(default=0)
+    event_mask: InotifyMasks = attr.ib(default=None)
+    recursive_watch: Optional[RecursiveWatch] = attr.ib(default=None)
+    last_activity: float = attr.ib(factory=time.monotonic)
+    polling: bool = attr.ib(default=False)
+    _snapshot: Optional[DirectorySnapshot] = attr.ib(default=None, repr=False)
+
+    @property
+    def watch_count(self) -> int:
+        """Kernel watches held, growing and shrinking with a recursive watch's tree.
+
+        A recursive watch's count includes the watches of anything watched below it.
+        """
+        if self.polling:
+            return 0
+        if self.recursive_watch is not None:
+            return self.watch_manager.watch_count(self.path)
+        return int(self.path in self.watch_manager._watches)
+
+    def directories(self) -> List[str]:
+        """List the directories the watch covers, scanning the filesystem.
+
+        :return list: Absolute paths.
+        """
+        return _tree_directories(self.path, self.recursive_watch)
+
+
+@attr.s(auto_attribs=True)
+class WatchBudget:
+    """Keep watches added through it within ``fs.inotify.max_user_watches``.
+
+    The limit is shared by every inotify instance of the user, so usage by anything else is
+    counted once, when the budget is created (see :py:func:`inotify_watch_usage`), while
+    watches added through the budget are counted as they grow and shrink.  Watches nested in a
+    recursive watch share its kernel watches and are only counted once.
+
+    :py:meth:`add_watch` reserves the watches a tree needs before adding any of them.  If there
+    is not enough room, watches of lower priority are given up, least recently active first,
+    either dropped or, with ``degrade_to_polling``, rescanned every ``poll_interval`` seconds
+    by :py:meth:`poll`.  If that is still not enough the new watch is degraded itself, or
+    ``ENOSPC`` raised.  :py:meth:`poll` also gives polled watches their kernel watches back
+    once there is room again.
+
+    :py:meth:`add_watch` scans trees in the calling thread, use :py:meth:`add_watch_recursive`
+    from inside trio tasks.
+
+    :ivar int limit: Watches available to the user.
+    :ivar int headroom: Watches to leave free for others.
+    :ivar bool degrade_to_polling: Poll watches that do not fit instead of dropping them.
+    :ivar float poll_interval: Seconds between scans of polled watches.
+    :ivar int external_usage: Watches held outside this budget.
+    """
+
+    limit: int = attr.ib(factory=max_user_watches)
+    headroom: int = attr.ib(default=128)
+    degrade_to_polling: bool = attr.ib(default=True)
+    poll_interval: float = attr.ib(default=5.0)
+    external_usage: int = attr.ib(factory=inotify_watch_usage)
+    watches: PathTrie = attr.ib(init=False, factory=PathTrie)
+
+    @property
+    def used(self) -> int:
+        """Watches in use, by this budget and others."""
+        return self.external_usage + sum(
+            self._counted_watches(budgeted_watch)
+            for budgeted_watch in self.watches.values()
+        )
+
+    @property
+    def available(self) -> int:
+        """Watches that can still be added, keeping ``headroom`` free."""
+        return self.limit - self.headroom - self.used
+
+    def _covering_watch(self, budgeted_watch: BudgetedWatch) -> Optional[BudgetedWatch]:
+        """Find the nearest enclosing recursive watch holding kernel watches.
+
+        Its count includes the watches of ``budgeted_watch``, and removing its kernel watches
+        removes those of ``budgeted_watch`` too.
+
+        :param BudgetedWatch budgeted_watch: Any budgeted watch.
+        :return BudgetedWatch: Enclosing watch, ``None`` if there is none.
+        """
+        for _, ancestor in reversed(
+            self.watches.prefix_items(budgeted_watch.path, include_self=False)
+        ):
+            if (
+                ancestor.recursive_watch is not None
+                and not ancestor.polling
+                and ancestor.watch_manager is budgeted_watch.watch_manager
+            ):
+                return ancestor
+        return None
+
+    def _counted_watches(self, budgeted_watch: BudgetedWatch) -> int:
+        """Kernel watches a watch adds to :py:attr:`used`, none if an enclosing watch counts them.
+
+        :param BudgetedWatch budgeted_watch: Any budgeted watch.
+        :return int: Number of watches.
+        """
+        if budgeted_watch.polling or self._covering_watch(budgeted_watch) is not None:
+            return 0
+        return budgeted_watch.watch_count
+
+    @staticmethod
+    def _needed_watches(watch_manager: WatchManager, directories: List[str]) -> int:
+        """Count the directories a new watch would add kernel watches for.
+
+        :param WatchManager watch_manager: Manager the watch is added to.
+        :param list directories: Directories the watch covers.
+        :return int: Directories not watched yet.
+        """
+        return sum(
+            watch_manager.watch_covering(directory) != directory
+            for directory in directories
+        )
+
+    def _nested_watches(
+        self, budgeted_watch: BudgetedWatch, priority: Optional[int]
+    ) -> Tuple[List[BudgetedWatch], List[BudgetedWatch]]:
+        """Sort out the watches losing their kernel watches along with a recursive watch.
+
+        Nested watches of at least ``priority`` have their kernel watches added back, unless
+        another watch added back covers them, the others are given up with ``budgeted_watch``.
+
+        :param BudgetedWatch budgeted_watch: Watch about to lose its kernel watches.
+        :param int priority: Priority of the watch it makes way for, ``None`` if it is removed.
+        :return tuple: Nested watches to add back, and nested watches to give up.
+        """
+        kept: List[BudgetedWatch] = []
+        given_up: List[BudgetedWatch] = []
+        if budgeted_watch.recursive_watch is None:
+            return kept, given_up
+        nested: List[BudgetedWatch] = sorted(
+            (
+                nested_watch
+                for _, nested_watch in self.watches.subtree_items(
+                    budgeted_watch.path, include_self=False
+                )
+                if nested_watch.watch_manager is budgeted_watch.watch_manager
+                and not nested_watch.polling
+            ),
+            key=lambda nested_watch: nested_watch.path.count("/"),
+        )
+        for nested_watch in nested:
+            if any(
+                kept_watch.recursive_watch is not None
+                and _is_within(nested_watch.path, kept_watch.path)
+                for kept_watch in kept
+            ):
+                continue
+            if priority is None or nested_watch.priority >= priority:
+                kept.append(nested_watch)
+            else:
+                given_up.append(nested_watch)
+        return kept, given_up
+
+    def _eviction_plan(
+        self, needed: int, priority: int
+    ) -> Optional[List[BudgetedWatch]]:
+        """Pick watches of lower priority to evict so ``needed`` watches become available.
+
+        Watches are picked least recently active first.  Evicting a recursive watch only frees
+        the watches of what is nested in it and not evicted along with it.
+
+        :param int needed: Watches about to be added.
+        :param int priority: Priority of the watch about to be added.
+        :return list: Watches to evict, ``None`` if evicting all candidates is not enough.
+        """
+        available: int = self.available
+        plan: List[BudgetedWatch] = []
+        if available >= needed:
+            return plan
+        candidates: List[BudgetedWatch] = sorted(
+            (
+                budgeted_watch
+                for budgeted_watch in self.watches.values()
+                if budgeted_watch.priority < priority
+                and self._counted_watches(budgeted_watch)
+            ),
+            key=lambda budgeted_watch: (
+                budgeted_watch.priority,
+                budgeted_watch.last_activity,
+            ),
+        )
+        for budgeted_watch in candidates:
+            kept, _ = self._nested_watches(budgeted_watch, priority)
+            available += budgeted_watch.watch_count - sum(
+                kept_watch.watch_count for kept_watch in kept
+            )
+            plan.append(budgeted_watch)
+            if available >= needed:
+                return plan
+        return None
+
+    def _give_up(
+        self, budgeted_watch: BudgetedWatch, snapshot: Optional[DirectorySnapshot]
+    ) -> None:
+        """Switch a watch without kernel watches to polling, or drop it.
+
+        :param BudgetedWatch budgeted_watch: Watch that lost its kernel watches.
+        :param DirectorySnapshot snapshot: Recent state of its directories, maybe more, to poll
+            against.  ``None`` to drop the watch.
+        :return: None
+        """
+        if snapshot is None:
+            self.watches.pop(budgeted_watch.path, None)
+            return
+        budgeted_watch.polling = True
+        budgeted_watch._snapshot = DirectorySnapshot(
+            {
+                directory: entries
+                for directory, entries in snapshot.directories.items()
+                if _is_within(directory, budgeted_watch.path)
+            }
+        )
+
+    def _release(
+        self,
+        budgeted_watch: BudgetedWatch,
+        given_up: List[BudgetedWatch],
+        snapshot: Optional[DirectorySnapshot],
+    ) -> None:
+        """Remove a watch's kernel watches, giving it up along with nested watches.
+
+        :param BudgetedWatch budgeted_watch: Watch to evict.
+        :param list given_up: Nested watches evicted with it.
+        :param DirectorySnapshot snapshot: Recent state of their directories, ``None`` to drop
+            them.
+        :return: None
+        """
+        try:
+            budgeted_watch.watch_manager.del_watch(budgeted_watch.path)
+        except KeyError:
+            # Already gone, deleted or reaped.
+            pass
+        for evicted_watch in [budgeted_watch] + given_up:
+            self._give_up(evicted_watch, snapshot)
+
+    def _add_kernel_watch(self, budgeted_watch: BudgetedWatch) -> bool:
+        """Add the kernel watches of a budgeted watch.
+
+        :param BudgetedWatch budgeted_watch: Watch to add.
+        :raises OSError: The watch could not be added, other than for lack of watches.
+        :return bool: The watch was added, ``False`` if out of watches.
+        """
+        recursive_watch: Optional[RecursiveWatch] = budgeted_watch.recursive_watch
+        try:
+            if recursive_watch is None:
+                budgeted_watch.watch_manager.add_watch(
+                    budgeted_watch.path, budgeted_watch.event_mask
+                )
+            else:
+                budgeted_watch.watch_manager.add_watch(
+                    budgeted_watch.path,
+                    budgeted_watch.event_mask,
+                    recursive=True,
+                    exclude=recursive_watch.exclude,
+                    max_depth=recursive_watch.max_depth,
+                )
+        except OSError as error:
+            # Directories appeared since counting, or others took watches meanwhile.
+            if error.errno != errno.ENOSPC:
+                raise
+            return False
+        budgeted_watch.polling = False
+        budgeted_watch._snapshot = None
+        return True
+
+    async def _add_kernel_watch_threaded(
+        self, budgeted_watch: BudgetedWatch, max_workers: int = 8
+    ) -> bool:
+        """Add the kernel watches of a budgeted watch, walking trees in worker threads.
+
+        :param BudgetedWatch budgeted_watch: Watch to add.
+        :param int max_workers: Most worker threads walking at once.
+        :raises OSError: The watch could not be added, other than for lack of watches.
+        :return bool: The watch was added, ``False`` if out of watches.
+        """
+        recursive_watch: Optional[RecursiveWatch] = budgeted_watch.recursive_watch
+        if recursive_watch is None:
+            return self._add_kernel_watch(budgeted_watch)
+        try:
+            await budgeted_watch.watch_manager.add_watch_recursive(
+                budgeted_watch.path,
+                budgeted_watch.event_mask,
+                max_workers=max_workers,
+                exclude=recursive_watch.exclude,
+                max_depth=recursive_watch.max_depth,
+            )
+        except OSError as error:
+            # Directories appeared since counting, or others took watches meanwhile.
+            if error.errno != errno.ENOSPC:
+                raise
+            return False
+        budgeted_watch.polling = False
+        budgeted_watch._snapshot = None
+        return True
+
+    def _evict(self, budgeted_watch: BudgetedWatch, priority: Optional[int]) -> None:
+        """Give up a watch's kernel watches, to be polled or dropped.
+
+        Nested watches losing their kernel watches too are added back or given up as well,
+        see :py:meth:`_nested_watches`.
+
+        :param BudgetedWatch budgeted_watch: Watch to give up.
+        :param int priority: Priority of the watch it makes way for, ``None`` if it is removed.
+        :return: None
+        """
+        kept, given_up = self._nested_watches(budgeted_watch, priority)
+        snapshot: Optional[DirectorySnapshot] = None
+        if self.degrade_to_polling and priority is not None:
+            snapshot = DirectorySnapshot.take(
+                _polled_directories([budgeted_watch] + given_up)
+            )
+        self._release(budgeted_watch, given_up, snapshot)
+        for kept_watch in kept:
+            if not self._add_kernel_watch(kept_watch):
+                kept_snapshot: Optional[DirectorySnapshot] = None
+                if self.degrade_to_polling:
+                    kept_snapshot = DirectorySnapshot.take(kept_watch.directories())
+                self._give_up(kept_watch, kept_snapshot)
+
+    async def _evict_threaded(
+        self, budgeted_watch: BudgetedWatch, priority: int, max_workers: int = 8
+    ) -> None:
+        """Like :py:meth:`_evict`, scanning and walking trees in worker threads.
+
+        :param BudgetedWatch budgeted_watch: Watch to give up.
+        :param int priority: Priority of the watch it makes way for.
+        :param int max_workers: Most worker threads scanning at once.
+        :return: None
+        """
+        kept, given_up = self._nested_watches(budgeted_watch, priority)
+        snapshot: Optional[DirectorySnapshot] = None
+        if self.degrade_to_polling:
+            directories = await trio.to_thread.run_sync(
+                _polled_directories, [budgeted_watch] + given_up
+            )
+            snapshot = await take_snapshot(directories, max_workers)
+        self._release(budgeted_watch, given_up, snapshot)
+        for kept_watch in kept:
+            if not await self._add_kernel_watch_threaded(kept_watch, max_workers):
+                kept_snapshot: Optional[DirectorySnapshot] = None
+                if self.degrade_to_polling:
+                    directories = await trio.to_thread.run_sync(kept_watch.directories)
+                    kept_snapshot = await take_snapshot(directories, max_workers)
+                self._give_up(kept_watch, kept_snapshot)
+
+    @staticmethod
+    def _new_watch(
+        watch_manager: WatchManager,
+        path: str,
+        event_mask: InotifyMasks,
+        recursive: bool,
+        exclude: Iterable[str],
+        max_depth: Optional[int],
+        priority: int,
+    ) -> BudgetedWatch:
+        path = os.path.abspath(path)
+        if not event_mask:
+            event_mask = InotifyMasks.IN_ALL_EVENTS
+        recursive_watch: Optional[RecursiveWatch] = None
+        if recursive:
+            recursive_watch = RecursiveWatch(
+                event_mask | RECURSIVE_WATCH_MASK, exclude, max_depth
+            )
+        return BudgetedWatch(watch_manager, path, priority, event_mask, recursive_watch)
+
+    def add_watch(
+        self,
+        watch_manager: WatchManager,
+        path: str,
+        event_mask: InotifyMasks = None,
+        recursive: bool = False,
+        exclude: Iterable[str] = (),
+        max_depth: Optional[int] = None,
+        priority: int = 0,
+    ) -> BudgetedWatch:
+        """Add a watch once there is room for all of it, see :py:meth:`WatchManager.add_watch`.
+
+        The tree of a recursive watch is walked first to count the watches it needs, then again
+        to add them, blocking the calling thread, see :py:meth:`add_watch_recursive`.
+
+        :param WatchManager watch_manager: Manager to add the watch to.
+        :param str path: File/directory to watch.
+        :param InotifyMasks event_mask: inotify events to watch for.
+        :param bool recursive: Include subdirectories/newly created directories.
+        :param iterable exclude: Glob patterns of subdirectories to leave out.
+        :param int max_depth: Deepest level of subdirectories to watch, default no limit.
+        :param int priority: Watches of lower priority are given up to make room for this one.
+        :raises OSError: ``ENOSPC`` if there is no room and ``degrade_to_polling`` is off.
+        :return BudgetedWatch: The watch, possibly degraded to polling.
+        """
+        budgeted_watch: BudgetedWatch = self._new_watch(
+            watch_manager, path, event_mask, recursive, exclude, max_depth, priority
+        )
+        directories: List[str] = budgeted_watch.directories()
+        plan: Optional[List[BudgetedWatch]] = self._eviction_plan(
+            self._needed_watches(watch_manager, directories), priority
+        )
+        if plan is not None:
+            for evicted_watch in plan:
+                self._evict(evicted_watch, priority)
+            if self._add_kernel_watch(budgeted_watch):
+                self.watches[budgeted_watch.path] = budgeted_watch
+                return budgeted_watch
+        if not self.degrade_to_polling:
+            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC), budgeted_watch.path)
+        self._give_up(budgeted_watch, DirectorySnapshot.take(directories))
+        self.watches[budgeted_watch.path] = budgeted_watch
+        return budgeted_watch
+
+    async def add_watch_recursive(
+        self,
+        watch_manager: WatchManager,
+        path: str,
+        event_mask: InotifyMasks = None,
+        exclude: Iterable[str] = (),
+        max_depth: Optional[int] = None,
+        priority: int = 0,
+        max_workers: int = 8,
+    ) -> BudgetedWatch:
+        """Like :py:meth:`add_watch` with ``recursive`` set, without blocking the event loop.
+
+        Trees are counted, snapshotted and walked in worker threads, see
+        :py:meth:`WatchManager.add_watch_recursive`.
+
+        :param WatchManager watch_manager: Manager to add the watch to.
+        :param str path: Directory to watch.
+        :param InotifyMasks event_mask: inotify events to watch for.
+        :param iterable exclude: Glob patterns of subdirectories to leave out.
+        :param int max_depth: Deepest level of subdirectories to watch, default no limit.
+        :param int priority: Watches of lower priority are given up to make room for this one.
+        :param int max_workers: Most worker threads scanning at once.
+        :raises OSError: ``ENOSPC`` if there is no room and ``degrade_to_polling`` is off.
+        :return BudgetedWatch: The watch, possibly degraded to polling.
+        """
+        budgeted_watch: BudgetedWatch = self._new_watch(
+            watch_manager, path, event_mask, True, exclude, max_depth, priority
+        )
+        directories: List[str] = await trio.to_thread.run_sync(
+            budgeted_watch.directories
+        )
+        plan: Optional[List[BudgetedWatch]] = self._eviction_plan(
+            self._needed_watches(watch_manager, directories), priority
+        )
+        if plan is not None:
+            for evicted_watch in plan:
+                await self._evict_threaded(evicted_watch, priority, max_workers)
+            if await self._add_kernel_watch_threaded(budgeted_watch, max_workers):
+                self.watches[budgeted_watch.path] = budgeted_watch
+                return budgeted_watch
+        if not self.degrade_to_polling:
+            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC), budgeted_watch.path)
+        self._give_up(budgeted_watch, await take_snapshot(directories, max_workers))
+        self.watches[budgeted_watch.path] = budgeted_watch
+        return budgeted_watch
+
+    def del_watch(self, path: str) -> None:
+        """Remove a watch added through the budget.
+
+        Watches nested in it keep their kernel watches, which are added back, blocking the
+        calling thread.
+
+        :param str path: File/directory to stop watching.
+        :return: None
+        """
+        budgeted_watch: BudgetedWatch = self.watches.pop(os.path.abspath(path))
+        if budgeted_watch.polling or self._covering_watch(budgeted_watch) is not None:
+            # No kernel watches of its own, or still needed by the enclosing watch.
+            return
+        self._evict(budgeted_watch, None)
+
+    def record_activity(self, watch_manager: WatchManager, wd: int) -> None:
+        """Note an event on a watch, keeping it from being evicted ahead of idle ones.
+
+        :param WatchManager watch_manager: Manager the event was read from.
+        :param int wd: Watch descriptor of the event.
+        :return: None
+        """
+        path: Optional[str] = watch_manager.path_for_wd(wd)
+        if path is None:
+            return
+        budgeted_item = self.watches.longest_prefix_item(path)
+        if budgeted_item is not None:
+            budgeted_item[1].last_activity = time.monotonic()
+
+    async def _restore(self) -> None:
+        """Give polled watches their kernel watches back, highest priority first, as room allows.
+
+        :return: None
+        """
+        polled: List[BudgetedWatch] = sorted(
+            (
+                budgeted_watch
+                for budgeted_watch in self.watches.values()
+                if budgeted_watch.polling
+            ),
+            key=lambda budgeted_watch: (
+                -budgeted_watch.priority,
+                -budgeted_watch.last_activity,
+            ),
+        )
+        for budgeted_watch in polled:
+            directories = await trio.to_thread.run_sync(budgeted_watch.directories)
+            if (
+                self._needed_watches(budgeted_watch.watch_manager, directories)
+                > self.available
+            ):
+                continue
+            try:
+                await self._add_kernel_watch_threaded(budgeted_watch)
+            except OSError:
+                # Gone meanwhile, keep polling for its return.
+                continue
+
+    async def poll(self, send_channel: trio.abc.SendChannel) -> None:
+        """Rescan polled watches every ``poll_interval`` seconds, sending what changed.
+
+        Runs until cancelled.  Changes are sent as synthetic events, with ``path`` filled in and
+        no watch descriptor (``wd`` is ``-1``) as there is no kernel watch behind them.  Polled
+        watches get their kernel watches back once there is room for them.
+
+        :param trio.abc.SendChannel send_channel: Channel to deliver events to.
+        :return: None
+        """
+        while True:
+            await trio.sleep(self.poll_interval)
+            for budgeted_watch in list(self.watches.values()):
+                if not budgeted_watch.polling:
+                    continue
+                directories = await trio.to_thread.run_sync(budgeted_watch.directories)
+                snapshot = await take_snapshot(directories)
+                previous_snapshot = budgeted_watch._snapshot
+                budgeted_watch._snapshot = snapshot
+                if previous_snapshot is None:
+                    continue
+                event_mask: int = budgeted_watch.event_mask.value
+                for directory, file_name, mask in previous_snapshot.diff(snapshot):
+                    if not mask & (event_mask | inotify_lib.IN_DELETE_SELF):
+                        continue
+                    path = directory
+                    if file_name:
+                        path = os.path.join(directory, os.fsdecode(file_name))
+                    await send_channel.send(
+                        InotifyEvent(-1, mask, 0, file_name, path=path)
+                    )
+            await self._restore()
@@ -0,0 +1,106 @@
+"""Reject unwanted events from their raw bytes, before they are decoded
+"""
+import os
+import re
+import attr
+from enum import Flag
+from typing import Dict, FrozenSet, Optional, Pattern, Tuple, Union
+from trio_inotify.routing import glob_to_regex
+
+
+def _mask_value(mask: Union[Flag, int, None]) -> Optional[int]:
+    return mask.value if isinstance(mask, Flag) else mask
+
+
+@attr.s(auto_attribs=True)
+class EventFilter:
+    """Rules for events a :py:class:`Watcher` should never decode.
+
+    Rules are checked against the raw event header and name bytes straight in the decoder loop,
+    a rejected event never becomes an object.  Events that change the watch tables are still
+    tracked, just not delivered.
+
+    :ivar InotifyMasks event_mask: Only accept events with one of these bits set, all if
+        ``None``.
+    :ivar iterable exclude_names: Glob patterns rejecting events by file name, such as
+        ``*.swp``.
+    :ivar iterable exclude_directories: Directory names, such as ``.git``, rejecting events on
+        them and on anything below them.
+    """
+
+    event_mask: Optional[int] = attr.ib(default=None, converter=_mask_value)
+    exclude_names: FrozenSet[str] = attr.ib(default=(), converter=frozenset)
+    exclude_directories: FrozenSet[str] = attr.ib(default=(), converter=frozenset)
+    _name_regex: Optional[Pattern] = attr.ib(init=False, default=None, repr=False)
+    # Verdict per watch descriptor, along with the path it was reached for.
+    _wd_verdicts: Dict[int, Tuple[str, bool]] = attr.ib(
+        init=False, factory=dict, repr=False
+    )
+
+    def __attrs_post_init__(self):
+        name_regexes = [
+            glob_to_regex(pattern) for pattern in sorted(self.exclude_names)
+        ] + [re.escape(name) for name in sorted(self.exclude_directories)]
+        if name_regexes:
+            self._name_regex = re.compile(
+                os.fsencode("(?:{})\\Z".format("|".join(name_regexes))), re.DOTALL
+            )
+
+    def _rejects_directory(self, wd: int, paths: Dict[int, str]) -> bool:
+        """Check whether a watch is on or below an excluded directory.
+
+        :param int wd: Watch descriptor.
+        :param dict paths: Watched path per watch descriptor.
+        :return bool: Events on this watch are rejected.
+        """
+        path: Optional[str] = paths.get(wd)
+        verdict = self._wd_verdicts.get(wd)
+        # Paths are interned, a watch descriptor reused for another path fails this check.
+        if verdict is not None and verdict[0] is path:
+            return verdict[1]
+        rejected: bool = path is not None and not self.exclude_directories.isdisjoint(
+            path.split("/")
+        )
+        if path is not None:
+            if len(self._wd_verdicts) > 2 * len(paths):
+                # Mostly stale, watch descriptors of watches that went away unnoticed.
+                self._wd_verdicts.clear()
+            self._wd_verdicts[wd] = (path, rejected)
+        return rejected
+
+    def forget(self, wd: int) -> None:
+        """Drop the cached verdict for a watch that went away.
+
+        :param int wd: Watch descriptor.
+        :return: None
+        """
+        self._wd_verdicts.pop(wd, None)
+
+    def rejects(
+        self,
+        wd: int,
+        mask: int,
+        buffer,
+        name_start: int,
+        name_end: int,
+        paths: Dict[int, str],
+    ) -> bool:
+        """Check an event straight from the read buffer.
+
+        :param int wd: Watch descriptor of the event.
+        :param int mask: Raw event mask.
+        :param bytes buffer: Read buffer holding the event.
+        :param int name_start: Offset of the event's file name in ``buffer``.
+        :param int name_end: Offset just past the file name, without NUL padding.
+        :param dict paths: Watched path per watch descriptor.
+        :return bool: The event should be skipped.
+        """
+        if self.event_mask is not None and not mask & self.event_mask:
+            return True
+        if self.exclude_directories and self._rejects_directory(wd, paths):
+            return True
+        return (
+            self._name_regex is not None
+            and name_end > name_start
+            and self._name_regex.match(buffer, name_start, name_end) is not None
+        )
@@ -1,21 +1,64 @@
 """Tools to interact with the inotify interface
 """
 import array
+import errno
 import fcntl
+import functools
+import inspect
+import math
 import os
+import re
+import struct
+import sys
 import attr
 import trio
-from enum import Flag
-from pathlib import Path
-from typing import Callable, Dict, List, NamedTuple, Type
+from collections import OrderedDict, deque
+from enum import Enum, Flag
+from typing import (
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Pattern,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 from trio_inotify._inotify_bridge import (
     ffi as inotify_ffi,
     lib as inotify_lib,
     inotify_init,
     inotify_add_watch,
+    inotify_add_watches,
     inotify_rm_watch,
 )
 from trio_inotify._ioctl_c import lib as ioctl_lib
+from trio_inotify._path_trie import PathTrie
+from trio_inotify.filters import EventFilter
+from trio_inotify.routing import HandlerRouter, Route, glob_to_regex
+from trio_inotify.snapshot import DirectorySnapshot, diff_snapshot, take_snapshot
+
+# Mirrors ``struct inotify_event`` without the trailing ``name`` member.
+INOTIFY_EVENT_HEADER = struct.Struct("=iIII")
+assert INOTIFY_EVENT_HEADER.size == inotify_ffi.sizeof("struct inotify_event")
+NAME_MAX = 255
+# Largest single event the kernel can return: header plus a NUL terminated name.
+MAX_INOTIFY_EVENT_SIZE = INOTIFY_EVENT_HEADER.size + NAME_MAX + 1
+MAX_QUEUED_EVENTS_PATH = "/proc/sys/fs/inotify/max_queued_events"
+DEFAULT_MAX_QUEUED_EVENTS = 16384
+# Largest default read buffer, further events are picked up by the next read.
+MAX_DEFAULT_READ_BUFFER_SIZE = 256 * 1024
+# Default number of event handler calls Watcher.run lets run at once.
+DEFAULT_HANDLER_CONCURRENCY = 16
 
 InotifyMasks = Flag(
     "InotifyMasks",
@@ -26,27 +69,326 @@ InotifyMasks = Flag(
     ],
 )
 
+# Raw mask bits, for testing event masks without building flags.
+_IN_ACCESS = inotify_lib.IN_ACCESS
+_IN_MODIFY = inotify_lib.IN_MODIFY
+_IN_ATTRIB = inotify_lib.IN_ATTRIB
+_IN_CLOSE_WRITE = inotify_lib.IN_CLOSE_WRITE
+_IN_OPEN = inotify_lib.IN_OPEN
+_IN_CLOSE_NOWRITE = inotify_lib.IN_CLOSE_NOWRITE
+_IN_MOVED_FROM = inotify_lib.IN_MOVED_FROM
+_IN_MOVED_TO = inotify_lib.IN_MOVED_TO
+_IN_MOVE = inotify_lib.IN_MOVE
+_IN_CREATE = inotify_lib.IN_CREATE
+_IN_DELETE = inotify_lib.IN_DELETE
+_IN_DELETE_SELF = inotify_lib.IN_DELETE_SELF
+_IN_MOVE_SELF = inotify_lib.IN_MOVE_SELF
+_IN_IGNORED = inotify_lib.IN_IGNORED
+_IN_Q_OVERFLOW = inotify_lib.IN_Q_OVERFLOW
+_IN_ISDIR = inotify_lib.IN_ISDIR
+_IN_MASK_ADD = inotify_lib.IN_MASK_ADD
+_IN_ALL_EVENTS = inotify_lib.IN_ALL_EVENTS
+# Events that can change the watch tables, see Watcher._track_inotify_event.
+_TRACKED_EVENTS = _IN_ISDIR | _IN_IGNORED | _IN_DELETE_SELF
+
+# Recursive watches need these to follow directories coming and going.
+RECURSIVE_WATCH_MASK = (
+    InotifyMasks.IN_CREATE
+    | InotifyMasks.IN_DELETE
+    | InotifyMasks.IN_MOVED_FROM
+    | InotifyMasks.IN_MOVED_TO
+)
+
+# Reading a watched directory queues these on its watch and its parent's, a rescan reads them
+# all, see OverflowPolicy.RESCAN.
+RESCAN_SUPPRESSED_MASK = (
+    InotifyMasks.IN_OPEN | InotifyMasks.IN_ACCESS | InotifyMasks.IN_CLOSE_NOWRITE
+)
+
+
+def _is_within(path: str, directory: str) -> bool:
+    """Check whether ``path`` is ``directory`` or below it.
+
+    :param str path: Absolute path.
+    :param str directory: Absolute path.
+    :return bool: ``path`` is inside ``directory``.
+    """
+    return path == directory or path.startswith(directory.rstrip("/") + "/")
+
+
+def max_queued_events() -> int:
+    """Read the per instance inotify queue limit from procfs.
+
+    :return int: Value of ``fs.inotify.max_queued_events``, or the kernel default if unreadable.
+    """
+    try:
+        with open(MAX_QUEUED_EVENTS_PATH) as max_queued_events_file:
+            return int(max_queued_events_file.read())
+    except (OSError, ValueError):
+        return DEFAULT_MAX_QUEUED_EVENTS
+
+
+def _only_os_error(error: BaseException) -> Optional[OSError]:
+    """Pick a single ``OSError`` out of the errors a nursery raised.
+
+    :param BaseException error: Error raised by a nursery, possibly a group of errors.
+    :return OSError: The first ``OSError``, ``None`` unless every error is one.
+    """
+    if isinstance(error, OSError):
+        return error
+    errors: Optional[Sequence[BaseException]] = getattr(error, "exceptions", None)
+    if not errors:
+        return None
+    os_errors = [_only_os_error(child_error) for child_error in errors]
+    if None in os_errors:
+        return None
+    return os_errors[0]
+
+
+def _compile_globs(patterns: Iterable[str]) -> Optional[Pattern]:
+    """Compile glob patterns into a single regex matching any of them.
+
+    :param iterable patterns: Glob patterns.
+    :return Pattern: Combined regex, ``None`` if there are no patterns.
+    """
+    regexes = [glob_to_regex(pattern) for pattern in sorted(patterns)]
+    if not regexes:
+        return None
+    return re.compile("(?:{})\\Z".format("|".join(regexes)), re.DOTALL)
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class RecursiveWatch:
+    """Settings of a recursive watch, applied to every directory in its tree.
+
+    :ivar InotifyMasks event_mask: inotify events every directory is watched for.
+    :ivar frozenset exclude: Glob patterns of directories neither watched nor descended into.
+        Patterns without a ``/`` match directory names, such as ``node_modules``, patterns with
+        one match paths relative to the recursive watch, such as ``build/*``.
+    :ivar int max_depth: Deepest level of subdirectories watched, ``0`` for only the directory
+        itself, ``None`` for no limit.
+    """
+
+    event_mask: InotifyMasks = attr.ib()
+    exclude: FrozenSet[str] = attr.ib(default=frozenset(), converter=frozenset)
+    max_depth: Optional[int] = attr.ib(default=None)
+    _name_regex: Optional[Pattern] = attr.ib(init=False, repr=False)
+    _path_regex: Optional[Pattern] = attr.ib(init=False, repr=False)
+
+    @_name_regex.default
+    def _compile_name_regex(self) -> Optional[Pattern]:
+        return _compile_globs(pattern for pattern in self.exclude if "/" not in pattern)
+
+    @_path_regex.default
+    def _compile_path_regex(self) -> Optional[Pattern]:
+        return _compile_globs(
+            pattern.strip("/") for pattern in self.exclude if "/" in pattern
+        )
+
+    def prunes(self, root: str, path: str) -> bool:
+        """Check whether a directory below the recursive watch is left out of it.
+
+        Only ``path`` itself is checked, its parents are assumed to be part of the tree.
+
+        :param str root: Absolute path of the recursive watch.
+        :param str path: Absolute path of a directory below ``root``.
+        :return bool: ``path`` is excluded or too deep.
+        """
+        relative_path: str = path[len(root) :].strip("/")
+        if not relative_path:
+            return False
+        if self.max_depth is not None and relative_path.count("/") >= self.max_depth:
+            return True
+        if self._name_regex is not None and self._name_regex.match(
+            relative_path.rpartition("/")[2]
+        ):
+            return True
+        return self._path_regex is not None and bool(
+            self._path_regex.match(relative_path)
+        )
+
+
+@attr.s(auto_attribs=True)
+class _WatchRollback:
+    """What adding a watch changed, to put back should it fail part way.
+
+    :ivar WatchManager watch_manager: Manager the watch is added to.
+    :ivar str path: Absolute path of the watch being added.
+    :ivar RecursiveWatch recursive_watch: Recursive watch on ``path`` before, if any.
+    :ivar int watch_mask: Requested mask of a plain watch on ``path`` before, if any.
+    :ivar frozenset existing_wds: Watch descriptors in use before.
+    :ivar dict kernel_masks: Path and previous mask of each existing watch given a new mask.
+    """
+
+    watch_manager: "WatchManager" = attr.ib()
+    path: str = attr.ib()
+    recursive_watch: Optional[RecursiveWatch] = attr.ib()
+    watch_mask: Optional[int] = attr.ib()
+    existing_wds: FrozenSet[int] = attr.ib()
+    kernel_masks: Dict[int, Tuple[str, Optional[int]]] = attr.ib(factory=dict)
+
+    @classmethod
+    def record(cls, watch_manager: "WatchManager", path: str) -> "_WatchRollback":
+        """Note the state a watch on ``path`` is about to change.
+
+        :param WatchManager watch_manager: Manager the watch is added to.
+        :param str path: Absolute path of the watch.
+        :return _WatchRollback: Undo log.
+        """
+        return cls(
+            watch_manager,
+            path,
+            watch_manager._recursive_watches.get(path),
+            watch_manager._watch_masks.get(path),
+            frozenset(watch_manager._rev_watches),
+        )
+
+    def add_watch_keys(self, wd: int, path: str, event_mask: int) -> None:
+        """Track a watch, see :py:meth:`WatchManager._add_watch_keys`, logging its old mask.
+
+        :param int wd: Watch descriptor.
+        :param str path: File/directory being watched.
+        :param int event_mask: Raw mask the kernel watch was added with.
+        :return: None
+        """
+        if wd in self.existing_wds and wd not in self.kernel_masks:
+            self.kernel_masks[wd] = (
+                path,
+                self.watch_manager._kernel_masks.get(wd),
+            )
+        self.watch_manager._add_watch_keys(wd, path, event_mask)
+
+    def undo(self) -> None:
+        """Remove the watches added below ``path``, restoring what existed before.
+
+        :return: None
+        """
+        watch_manager = self.watch_manager
+        for watched_path, wd in watch_manager._watches.subtree_items(self.path):
+            if wd not in self.existing_wds:
+                watch_manager._del_watch_keys(watched_path)
+                watch_manager._rm_watch(wd)
+        for wd, (watched_path, event_mask) in self.kernel_masks.items():
+            if event_mask is None or watch_manager._watches.get(watched_path) != wd:
+                continue
+            try:
+                inotify_add_watch(
+                    watch_manager.inotify_fd, os.fsencode(watched_path), event_mask
+                )
+            except OSError:
+                # Gone meanwhile, its delete event is still to come.
+                continue
+            watch_manager._kernel_masks[wd] = event_mask
+        if self.recursive_watch is None:
+            watch_manager._recursive_watches.pop(self.path, None)
+        else:
+            watch_manager._recursive_watches[self.path] = self.recursive_watch
+        if self.watch_mask is None:
+            watch_manager._watch_masks.pop(self.path, None)
+        else:
+            watch_manager._watch_masks[self.path] = self.watch_mask
+        watch_manager.recursive = bool(watch_manager._recursive_watches)
+
 
 @attr.s(auto_attribs=True)
 class WatchManager:
     """Add, remove and track watches on an inotify interface.
+
+    Each instance owns its own inotify instance (and kernel event queue), created on first use.
+
+    Full paths for events are resolved through a cache of up to ``path_cache_size`` joined
+    paths, see :py:meth:`resolve_path`.
+
+    Watches the kernel drops by itself are removed from the tables as their events are read,
+    ``reaped_watches`` counts them (see :py:meth:`_reap_watch`).
+
+    Once anything has subscribed to events (see :py:meth:`subscribe`), kernel watches only ask
+    for the subscribed events, so unwanted events are never queued.
     """
 
-    _watches: Dict[str, int] = attr.ib(init=False, default={})
-    _rev_watches: Dict[int, str] = attr.ib(init=False, default={})
+    _watches: PathTrie = attr.ib(init=False, factory=PathTrie)
+    _rev_watches: Dict[int, str] = attr.ib(init=False, factory=dict)
     recursive: bool = attr.ib(init=False, default=False)
-    inotify_fd: int = attr.ib(init=False, default=inotify_init())
+    _inotify_fd: int = attr.ib(init=False, default=None)
     inotify_event_flags: Type[InotifyMasks] = attr.ib(init=False, default=InotifyMasks)
+    _recursive_watches: PathTrie = attr.ib(init=False, factory=PathTrie)
+    # Directories moved from, by cookie, with the read they were moved in.
+    _pending_moves: Dict[int, Tuple[str, int]] = attr.ib(init=False, factory=dict)
+    _read_count: int = attr.ib(init=False, default=0, repr=False)
+    path_cache_size: int = attr.ib(default=65536)
+    _path_cache: Dict[int, Dict[bytes, str]] = attr.ib(
+        init=False, factory=dict, repr=False
+    )
+    _path_cache_entries: int = attr.ib(init=False, default=0, repr=False)
+    _removed_wds: Set[int] = attr.ib(init=False, factory=set, repr=False)
+    reaped_watches: int = attr.ib(init=False, default=0)
+    _subscriptions: Dict[Hashable, Tuple[Optional[str], int]] = attr.ib(
+        init=False, factory=dict, repr=False
+    )
+    # Subscription masks by key, per path subscribed to ("/" for any path).
+    _subscription_masks: PathTrie = attr.ib(init=False, factory=PathTrie, repr=False)
+    _watch_masks: Dict[str, int] = attr.ib(init=False, factory=dict, repr=False)
+    _kernel_masks: Dict[int, int] = attr.ib(init=False, factory=dict, repr=False)
+    _suppressions: Dict[Hashable, int] = attr.ib(init=False, factory=dict, repr=False)
+    _suppressed_mask: int = attr.ib(init=False, default=0, repr=False)
 
-    def _add_watch_keys(self, wd: int, path: str) -> None:
+    def __enter__(self) -> "WatchManager":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def inotify_fd(self) -> int:
+        """File descriptor of this manager's inotify instance, initialised on first access.
+
+        :return int: inotify file descriptor.
+        """
+        if self._inotify_fd is None:
+            self._inotify_fd = inotify_init()
+        return self._inotify_fd
+
+    def close(self) -> None:
+        """Close the inotify instance, dropping all of its watches.
+
+        A fresh inotify instance is created if the manager is used again.
+
+        :return: None
+        """
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+        self._watches.clear()
+        self._rev_watches.clear()
+        self._recursive_watches.clear()
+        self._pending_moves.clear()
+        self._path_cache.clear()
+        self._path_cache_entries = 0
+        self._removed_wds.clear()
+        self._watch_masks.clear()
+        self._kernel_masks.clear()
+        self.recursive = False
+
+    def _add_watch_keys(self, wd: int, path: str, event_mask: int = None) -> None:
         """Add new watch to internal lookup dictionaries.
 
         :param int wd: Watch descriptor
         :param str path: File/directory being watched
+        :param int event_mask: Raw mask the kernel watch was added with, if known.
         :return: None
         """
+        path = sys.intern(path)
+        previous_wd: Optional[int] = self._watches.get(path)
+        if previous_wd is not None and previous_wd != wd:
+            # Path was recreated, its old watch is dead and must not resolve to it any more.
+            self._rev_watches.pop(previous_wd, None)
+            self._path_cache.pop(previous_wd, None)
+            self._kernel_masks.pop(previous_wd, None)
         self._watches[path] = wd
         self._rev_watches[wd] = path
+        self._path_cache.pop(wd, None)
+        if event_mask is not None:
+            self._kernel_masks[wd] = event_mask
 
     def _del_watch_keys(self, path: str):
         """Remove watches from internal lookup dictionaries.
@@ -57,38 +399,575 @@ class WatchManager:
         watch_key: int = self._watches[path]
         del self._watches[path]
         del self._rev_watches[watch_key]
+        self._path_cache.pop(watch_key, None)
+        self._kernel_masks.pop(watch_key, None)
+        self._watch_masks.pop(path, None)
+
+    def path_for_wd(self, wd: int) -> Optional[str]:
+        """Look up the watched path for a watch descriptor.
+
+        :param int wd: Watch descriptor.
+        :return str: Watched file/directory, or ``None`` if ``wd`` is not a current watch.
+        """
+        return self._rev_watches.get(wd)
+
+    def resolve_path(self, wd: int, file_name: bytes) -> Optional[str]:
+        """Join an event's file name onto the path watched by its watch descriptor.
+
+        Joined paths are interned and cached per watch descriptor until the watch moves or is
+        removed, so repeat events for a file share one string.
+
+        :param int wd: Watch descriptor of the event.
+        :param bytes file_name: File name of the event, empty for events on the watch itself.
+        :return str: Absolute path, or ``None`` if ``wd`` is not a current watch.
+        """
+        names: Dict[bytes, str] = self._path_cache.get(wd, {})
+        path: Optional[str] = names.get(file_name)
+        if path is not None:
+            return path
+        watched_path: Optional[str] = self._rev_watches.get(wd)
+        if watched_path is None or not file_name:
+            return watched_path
+        if self._path_cache_entries >= self.path_cache_size:
+            self._path_cache.clear()
+            self._path_cache_entries = 0
+            names = {}
+        path = names[file_name] = sys.intern(
+            os.path.join(watched_path, os.fsdecode(file_name))
+        )
+        self._path_cache[wd] = names
+        self._path_cache_entries += 1
+        return path
+
+    def _recursive_mask_for(self, path: str) -> Optional[InotifyMasks]:
+        """Find the event mask of the recursive watch, if any, covering ``path``.
+
+        :param str path: Absolute path of a file/directory.
+        :return InotifyMasks: Event mask for new subdirectories, or ``None`` if not recursive.
+        """
+        recursive_watch = self._recursive_watches.longest_prefix_item(path)
+        return None if recursive_watch is None else recursive_watch[1].event_mask
+
+    def _prunes(self, path: str) -> bool:
+        """Check whether the recursive watch covering a directory leaves it out.
+
+        :param str path: Absolute path of a directory.
+        :return bool: ``path`` is excluded from its recursive watch, or too deep in it.
+        """
+        recursive_watch = self._recursive_watches.longest_prefix_item(path)
+        return recursive_watch is not None and recursive_watch[1].prunes(
+            recursive_watch[0], path
+        )
+
+    def _watched_subtree(self, path: str) -> List[str]:
+        """List watched paths below ``path``, without touching the filesystem.
+
+        :param str path: Absolute path of a watched directory.
+        :return list: Watched descendants of ``path``.
+        """
+        return [
+            watched
+            for watched, _ in self._watches.subtree_items(path, include_self=False)
+        ]
+
+    def watch_covering(self, path: str) -> Optional[str]:
+        """Find the watch closest above ``path``, i.e. the one its events are reported on.
+
+        :param str path: File/directory, which need not exist.
+        :return str: ``path`` itself or its nearest watched ancestor, ``None`` if neither.
+        """
+        watch = self._watches.longest_prefix_item(os.path.abspath(path))
+        return None if watch is None else watch[0]
+
+    def _watch_root(self, path: str) -> Optional[str]:
+        """Find the directory relative paths of events are taken from.
+
+        :param str path: Absolute path of an event.
+        :return str: Root of the recursive watch covering ``path``, else the watched directory
+            holding it, ``None`` if neither.
+        """
+        recursive_watch = self._recursive_watches.longest_prefix_item(path)
+        if recursive_watch is not None:
+            return recursive_watch[0]
+        return self.watch_covering(os.path.dirname(path))
+
+    def watch_count(self, path: str = "/") -> int:
+        """Count the watches on and below ``path``.
+
+        :param str path: File/directory, defaults to everything.
+        :return int: Number of watches.
+        """
+        return self._watches.subtree_size(os.path.abspath(path))
+
+    def _subscribed_mask(self, path: str, subtree: bool = False) -> int:
+        """Combine the masks of the subscriptions covering a path.
+
+        :param str path: Absolute path of a watched file/directory.
+        :param bool subtree: Include subscriptions for paths below ``path``.
+        :return int: Raw mask of every event subscribed to.
+        """
+        subscribed_mask = 0
+        subscriptions = self._subscription_masks.prefix_items(path)
+        if subtree:
+            subscriptions += self._subscription_masks.subtree_items(
+                path, include_self=False
+            )
+        for _, subscription_masks in subscriptions:
+            for subscription_mask in subscription_masks.values():
+                subscribed_mask |= subscription_mask
+        return subscribed_mask
+
+    def _path_subscribed_mask(self, path: str) -> int:
+        """Combine the masks of the subscriptions made for exactly ``path``.
+
+        :param str path: Absolute path, ``/`` for subscriptions to any path.
+        :return int: Raw mask.
+        """
+        subscribed_mask = 0
+        for subscription_mask in self._subscription_masks.get(path, {}).values():
+            subscribed_mask |= subscription_mask
+        return subscribed_mask
+
+    def _set_subscription(
+        self, key: Hashable, subscription: Optional[Tuple[Optional[str], int]]
+    ) -> None:
+        """Add, replace or remove a subscription, updating the kernel watches it affects.
+
+        Only watches below the paths whose combined mask changed are looked at, and none if no
+        combined mask changed, unless subscriptions start or stop narrowing masks altogether.
+
+        :param hashable key: Identifies the subscription.
+        :param tuple subscription: ``(path, mask)``, ``None`` to remove the subscription.
+        :return: None
+        """
+        had_subscriptions = bool(self._subscriptions)
+        previous = self._subscriptions.pop(key, None)
+        changed_paths: List[str] = []
+        if previous is not None:
+            changed_paths.append(previous[0] or "/")
+        if subscription is not None:
+            self._subscriptions[key] = subscription
+            changed_paths.append(subscription[0] or "/")
+        previous_masks: Dict[str, int] = {
+            path: self._path_subscribed_mask(path) for path in changed_paths
+        }
+        if previous is not None:
+            path_masks: Dict[Hashable, int] = self._subscription_masks[changed_paths[0]]
+            del path_masks[key]
+            if not path_masks:
+                del self._subscription_masks[changed_paths[0]]
+        if subscription is not None:
+            path_masks = self._subscription_masks.get(changed_paths[-1])
+            if path_masks is None:
+                self._subscription_masks[changed_paths[-1]] = path_masks = {}
+            path_masks[key] = subscription[1]
+        if had_subscriptions != bool(self._subscriptions):
+            self._update_kernel_masks("/")
+            return
+        for path, previous_mask in previous_masks.items():
+            if self._path_subscribed_mask(path) != previous_mask:
+                self._update_kernel_masks(path)
+
+    def _kernel_mask(self, path: str, event_mask: int, subtree: bool = False) -> int:
+        """Narrow a watch's mask down to the events subscribed to on its path.
+
+        Flags other than events (``IN_ONLYDIR`` and such) are kept, as are the events recursive
+        watches need to follow directories.  Suppressed events are left out whatever is
+        subscribed to, see :py:meth:`suppress_events`.  A watch nobody is interested in keeps
+        ``IN_DELETE_SELF``, as the kernel refuses empty masks.
+
+        :param str path: Absolute path of the watched file/directory.
+        :param int event_mask: Raw mask the watch was requested with.
+        :param bool subtree: The mask is used for directories below ``path`` too.
+        :return int: Raw mask to add the kernel watch with.
+        """
+        if not self._subscriptions and not self._suppressed_mask:
+            return event_mask
+        events: int = event_mask
+        if self._subscriptions:
+            events &= self._subscribed_mask(path, subtree)
+            if self._recursive_mask_for(path) is not None:
+                events |= event_mask & RECURSIVE_WATCH_MASK.value
+        events = events & _IN_ALL_EVENTS & ~self._suppressed_mask or _IN_DELETE_SELF
+        return (event_mask & ~_IN_ALL_EVENTS) | events
+
+    def _requested_mask(self, path: str) -> int:
+        """Find the mask a watch was requested with, before narrowing.
+
+        :param str path: Absolute path of a watched file/directory.
+        :return int: Raw mask.
+        """
+        event_mask: Optional[int] = self._watch_masks.get(path)
+        if event_mask is None:
+            recursive_mask: Optional[InotifyMasks] = self._recursive_mask_for(path)
+            if recursive_mask is None:
+                return _IN_ALL_EVENTS
+            event_mask = recursive_mask.value
+        return event_mask
+
+    def subscribe(
+        self,
+        key: Hashable,
+        event_mask: Union[InotifyMasks, int, None] = None,
+        path: Optional[str] = None,
+    ) -> None:
+        """Declare interest in events, narrowing kernel watches to what is subscribed to.
+
+        With no subscriptions every watch asks for its full mask.  Once there are some, a watch
+        only asks for the events of the subscriptions whose ``path`` covers it, existing
+        watches are updated straight away (see :py:meth:`_update_kernel_masks`).
+
+        :param hashable key: Identifies the subscription, subscribing again replaces it.
+        :param InotifyMasks event_mask: Events of interest, all if ``None``.
+        :param str path: Directory/file the subscription is confined to, ``None`` for any path.
+        :return: None
+        """
+        if event_mask is None:
+            event_mask = _IN_ALL_EVENTS
+        if path is not None:
+            path = os.path.abspath(path)
+        self._set_subscription(key, (path, _mask_value(event_mask)))
+
+    def unsubscribe(self, key: Hashable) -> None:
+        """Remove a subscription, see :py:meth:`subscribe`.
+
+        :param hashable key: Subscription to remove.
+        :return: None
+        """
+        if key in self._subscriptions:
+            self._set_subscription(key, None)
+
+    def suppress_events(
+        self, key: Hashable, event_mask: Union[InotifyMasks, int]
+    ) -> None:
+        """Keep events out of every kernel watch, whatever is subscribed to.
+
+        For events a reader causes itself, such as the directory reads of a rescan (see
+        :py:attr:`OverflowPolicy.RESCAN`).  Existing watches are updated straight away.
+
+        :param hashable key: Identifies the suppression, suppressing again replaces it.
+        :param InotifyMasks event_mask: Events to suppress.
+        :return: None
+        """
+        self._suppressions[key] = _mask_value(event_mask)
+        self._update_suppressed_mask()
+
+    def unsuppress_events(self, key: Hashable) -> None:
+        """Remove a suppression, see :py:meth:`suppress_events`.
+
+        :param hashable key: Suppression to remove.
+        :return: None
+        """
+        if self._suppressions.pop(key, None) is not None:
+            self._update_suppressed_mask()
+
+    def _update_suppressed_mask(self) -> None:
+        suppressed_mask = 0
+        for event_mask in self._suppressions.values():
+            suppressed_mask |= event_mask
+        if suppressed_mask != self._suppressed_mask:
+            self._suppressed_mask = suppressed_mask
+            self._update_kernel_masks("/")
+
+    def _update_kernel_masks(self, path: str = "/") -> None:
+        """Bring the masks of kernel watches in line with the current subscriptions.
+
+        A watch gaining events is extended with ``IN_MASK_ADD``, one losing any is re-added
+        with its new mask.  Watches whose mask is unchanged cost nothing.
+
+        :param str path: Only update watches on and below this path, defaults to all of them.
+        :return: None
+        """
+        for path, wd in self._watches.subtree_items(path):
+            event_mask: int = self._kernel_mask(path, self._requested_mask(path))
+            kernel_mask: Optional[int] = self._kernel_masks.get(wd)
+            if kernel_mask == event_mask:
+                continue
+            if kernel_mask is not None and event_mask & kernel_mask == kernel_mask:
+                add_mask = (event_mask & ~kernel_mask) | _IN_MASK_ADD
+            else:
+                add_mask = event_mask
+            try:
+                new_wd: int = inotify_add_watch(
+                    self.inotify_fd, os.fsencode(path), add_mask
+                )
+            except OSError as error:
+                if error.errno in (errno.ENOENT, errno.ENOTDIR):
+                    # Gone, its delete event is still to come.
+                    continue
+                raise
+            self._add_watch_keys(new_wd, path, event_mask)
 
     def add_watch(
-        self, path: str, event_mask: InotifyMasks = None, recursive: bool = False
+        self,
+        path: str,
+        event_mask: InotifyMasks = None,
+        recursive: bool = False,
+        exclude: Iterable[str] = (),
+        max_depth: Optional[int] = None,
     ) -> None:
         """Add new watch to inotify interface and track.
 
+        Recursive watches also watch for directories being created, moved or deleted, see
+        :py:meth:`Watcher.get_inotify_event`.  ``exclude`` and ``max_depth`` prune the tree,
+        both when it is first walked and as directories appear later, see
+        :py:class:`RecursiveWatch`.
+
         :param str path: File/directory to watch.
         :param InotifyMasks event_mask: inotify events to watch for.
         :param bool recursive: Include subdirectories/newly created directories.
+        :param iterable exclude: Glob patterns of subdirectories to leave out.
+        :param int max_depth: Deepest level of subdirectories to watch, default no limit.
+        :raises OSError: A watch could not be added, ``ENOSPC`` once out of watches.  Nothing
+            of a failed recursive watch is left registered.
         :return: None
         """
+        path = os.path.abspath(path)
         if not event_mask:
             event_mask = self.inotify_event_flags.IN_ALL_EVENTS
-        wd: int = inotify_add_watch(
-            self.inotify_fd, path.encode("utf-8"), event_mask.value
-        )
-        self._add_watch_keys(wd, path)
+        rollback = _WatchRollback.record(self, path)
+        recursive_watch: Optional[RecursiveWatch] = None
         if recursive:
             self.recursive: bool = True
-            event_mask = (
-                event_mask
-                | self.inotify_event_flags.IN_ISDIR
-                | self.inotify_event_flags.IN_CREATE
-                | self.inotify_event_flags.IN_DELETE
+            event_mask = event_mask | RECURSIVE_WATCH_MASK
+            recursive_watch = RecursiveWatch(event_mask, exclude, max_depth)
+            self._recursive_watches[path] = recursive_watch
+        else:
+            self._watch_masks[path] = event_mask.value
+        kernel_mask: int = self._kernel_mask(path, event_mask.value, recursive)
+        try:
+            wd: int = inotify_add_watch(self.inotify_fd, os.fsencode(path), kernel_mask)
+            rollback.add_watch_keys(wd, path, kernel_mask)
+            if recursive:
+                watched, _ = self._add_tree_watches(
+                    [path],
+                    kernel_mask,
+                    recursive_root=(path, recursive_watch),
+                    existing_wds=rollback.existing_wds,
+                )
+                for wd, full_path_str in watched:
+                    rollback.add_watch_keys(wd, full_path_str, kernel_mask)
+        except OSError:
+            # Leave nothing half registered behind.
+            rollback.undo()
+            raise
+
+    def add_watches(
+        self, paths: List[str], event_mask: InotifyMasks = None
+    ) -> Dict[str, OSError]:
+        """Add the same watch to many paths, registering them all with a single call into C.
+
+        :param list paths: Files/directories to watch.
+        :param InotifyMasks event_mask: inotify events to watch for.
+        :return dict: Paths that could not be watched, mapped to the error for each.
+        """
+        if not event_mask:
+            event_mask = self.inotify_event_flags.IN_ALL_EVENTS
+        paths = [os.path.abspath(path) for path in paths]
+        # One mask for the whole call, wide enough for every path.
+        kernel_mask = 0
+        for path in paths:
+            kernel_mask |= self._kernel_mask(path, event_mask.value)
+        wds, errnos = inotify_add_watches(
+            self.inotify_fd, [os.fsencode(path) for path in paths], kernel_mask
+        )
+        failed: Dict[str, OSError] = {}
+        for path, wd, watch_errno in zip(paths, wds, errnos):
+            if watch_errno:
+                failed[path] = OSError(watch_errno, os.strerror(watch_errno), path)
+            else:
+                self._watch_masks[path] = event_mask.value
+                self._add_watch_keys(wd, path, kernel_mask)
+        return failed
+
+    def _add_tree_watches(
+        self,
+        directories: List[str],
+        event_mask: int,
+        max_directories: int = None,
+        recursive_root: Tuple[str, RecursiveWatch] = None,
+        existing_wds: FrozenSet[int] = frozenset(),
+    ) -> Tuple[List[Tuple[int, str]], List[str]]:
+        """Watch every subdirectory below ``directories``.
+
+        Only adds kernel watches, leaving the lookup dictionaries alone, so it is safe to run in
+        a worker thread.  The subdirectories of each directory are registered with a single
+        call into C.  Subdirectories vanishing mid walk are skipped, as are subdirectories the
+        recursive watch prunes, without being scanned.
+
+        :param list directories: Absolute paths of already watched directories to descend into.
+        :param int event_mask: Raw mask to add the watches with.
+        :param int max_directories: Stop after scanning this many directories, default no limit.
+        :param tuple recursive_root: Path and settings of the recursive watch being walked.
+        :param frozenset existing_wds: Watch descriptors that existed before the walk, kept if
+            it fails.
+        :raises OSError: A watch could not be added, the kernel watches this call added are
+            removed again.
+        :return tuple: ``(wd, path)`` of each new watch, and watched directories not yet scanned.
+        """
+        watched: List[Tuple[int, str]] = []
+        pending: List[str] = list(directories)
+        scanned = 0
+        while pending and (max_directories is None or scanned < max_directories):
+            directory = pending.pop()
+            scanned += 1
+            try:
+                directory_entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            # d_type from the directory read, no stat unless the filesystem omits it.
+            subdirectories: List[str] = [
+                directory_entry.path
+                for directory_entry in directory_entries
+                if directory_entry.is_dir(follow_symlinks=False)
+            ]
+            if recursive_root is not None:
+                root, recursive_watch = recursive_root
+                subdirectories = [
+                    subdirectory
+                    for subdirectory in subdirectories
+                    if not recursive_watch.prunes(root, subdirectory)
+                ]
+            wds, errnos = inotify_add_watches(
+                self.inotify_fd,
+                [os.fsencode(subdirectory) for subdirectory in subdirectories],
+                event_mask,
             )
-            for root, dirs, _ in os.walk(path):
-                for directory in dirs:
-                    full_path_str = Path(root, directory).absolute().as_posix()
-                    wd = inotify_add_watch(
-                        self.inotify_fd, full_path_str.encode("utf-8"), event_mask.value
+            for subdirectory, wd, watch_errno in zip(subdirectories, wds, errnos):
+                if watch_errno in (errno.ENOENT, errno.ENOTDIR):
+                    continue
+                if watch_errno:
+                    # Undo this call's kernel watches, typically out of watches (ENOSPC).
+                    self._rollback_tree_watches(
+                        watched
+                        + [
+                            (added_wd, added_path)
+                            for added_path, added_wd, add_errno in zip(
+                                subdirectories, wds, errnos
+                            )
+                            if not add_errno
+                        ],
+                        existing_wds,
+                    )
+                    raise OSError(watch_errno, os.strerror(watch_errno), subdirectory)
+                watched.append((wd, subdirectory))
+                pending.append(subdirectory)
+        return watched, pending
+
+    def _rollback_tree_watches(
+        self, watched: List[Tuple[int, str]], existing_wds: FrozenSet[int]
+    ) -> None:
+        """Undo the kernel watches of a failed :py:meth:`_add_tree_watches` call.
+
+        Watch descriptors that existed before belong to watches the kernel handed back again,
+        those are kept with the mask they had.  None of them are in the tables yet.
+
+        :param list watched: ``(wd, path)`` of each watch the call added.
+        :param frozenset existing_wds: Watch descriptors that existed before the walk.
+        :return: None
+        """
+        for wd, path in dict(watched).items():
+            try:
+                if wd not in existing_wds:
+                    inotify_rm_watch(self.inotify_fd, wd)
+                elif wd in self._kernel_masks:
+                    inotify_add_watch(
+                        self.inotify_fd, os.fsencode(path), self._kernel_masks[wd]
                     )
-                    self._add_watch_keys(wd, full_path_str)
+            except OSError:
+                pass
+
+    async def add_watch_recursive(
+        self,
+        path: str,
+        event_mask: InotifyMasks = None,
+        progress: Callable[[int], None] = None,
+        max_workers: int = 8,
+        chunk_size: int = 256,
+        exclude: Iterable[str] = (),
+        max_depth: Optional[int] = None,
+    ) -> int:
+        """Recursively watch a directory, walking it in worker threads.
+
+        Equivalent to ``add_watch(path, event_mask, recursive=True, exclude, max_depth)`` but
+        without blocking the event loop.  Each worker scans up to ``chunk_size`` directories before handing its
+        unscanned directories back to be spread over the other workers.
+
+        :param str path: Directory to watch.
+        :param InotifyMasks event_mask: inotify events to watch for.
+        :param callable progress: Called with the number of subdirectories watched so far as the
+            walk progresses.
+        :param int max_workers: Most worker threads walking at once.
+        :param int chunk_size: Directories scanned per worker thread call.
+        :param iterable exclude: Glob patterns of subdirectories to leave out.
+        :param int max_depth: Deepest level of subdirectories to watch, default no limit.
+        :raises OSError: A watch could not be added, nothing of the watch is left registered.
+        :return int: Number of subdirectories watched.
+        """
+        path = os.path.abspath(path)
+        if not event_mask:
+            event_mask = self.inotify_event_flags.IN_ALL_EVENTS
+        event_mask = event_mask | RECURSIVE_WATCH_MASK
+        rollback = _WatchRollback.record(self, path)
+        self.recursive = True
+        recursive_watch = RecursiveWatch(event_mask, exclude, max_depth)
+        self._recursive_watches[path] = recursive_watch
+        kernel_mask: int = self._kernel_mask(path, event_mask.value, subtree=True)
+        try:
+            wd: int = inotify_add_watch(self.inotify_fd, os.fsencode(path), kernel_mask)
+        except OSError:
+            rollback.undo()
+            raise
+        rollback.add_watch_keys(wd, path, kernel_mask)
+        limiter = trio.CapacityLimiter(max_workers)
+        watched_count = 0
+
+        async def walk(directories: List[str]) -> None:
+            nonlocal watched_count
+            watched, pending = await trio.to_thread.run_sync(
+                self._add_tree_watches,
+                directories,
+                kernel_mask,
+                chunk_size,
+                (path, recursive_watch),
+                rollback.existing_wds,
+                limiter=limiter,
+            )
+            for wd, full_path_str in watched:
+                rollback.add_watch_keys(wd, full_path_str, kernel_mask)
+            watched_count += len(watched)
+            if progress is not None:
+                progress(watched_count)
+            for i in range(0, len(pending), chunk_size):
+                nursery.start_soon(walk, pending[i : i + chunk_size])
+
+        try:
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(walk, [path])
+        except BaseException as error:
+            # Failed or cancelled part way, leave nothing half registered behind.
+            rollback.undo()
+            os_error: Optional[OSError] = _only_os_error(error)
+            if os_error is None or os_error is error:
+                raise
+            # Several walkers failed, raise one error as documented.
+            raise os_error from error
+        return watched_count
+
+    def _rm_watch(self, wd: int) -> None:
+        """Remove a kernel watch, tolerating watches the kernel already dropped.
+
+        :param int wd: Watch descriptor.
+        :return: None
+        """
+        try:
+            inotify_rm_watch(self.inotify_fd, wd)
+        except OSError as error:
+            # The watched directory was deleted or its filesystem unmounted.
+            if error.errno != errno.EINVAL:
+                raise
+        else:
+            self._removed_wds.add(wd)
 
     def del_watch(self, path: str) -> None:
         """Remove a watch.  Removes recursively if removing a recursive watch member.
@@ -96,41 +975,600 @@ class WatchManager:
         :param str path: File/directory to stop watching.
         :return: None
         """
+        path = os.path.abspath(path)
         watch_key: int = self._watches[path]
-        inotify_rm_watch(self.inotify_fd, watch_key)
+        self._rm_watch(watch_key)
         self._del_watch_keys(path)
-        if self.recursive:
-            for root, dirs, _ in os.walk(path):
-                for directory in dirs:
-                    full_path: str = Path(root, directory).absolute().as_posix()
-                    wd: int = self._watches[full_path]
-                    inotify_rm_watch(self.inotify_fd, wd)
-                    self._del_watch_keys(full_path)
+        if self._recursive_mask_for(path) is not None:
+            for full_path in self._watched_subtree(path):
+                self._rm_watch(self._watches[full_path])
+                self._del_watch_keys(full_path)
+                self._recursive_watches.pop(full_path, None)
+            self._recursive_watches.pop(path, None)
+        self.recursive = bool(self._recursive_watches)
 
+    def _forget_subtree(self, path: str) -> None:
+        """Drop the tracked watches on a deleted directory and below.
 
-@attr.s(auto_attribs=True)
+        The kernel removes watches on deleted directories itself, so no watches are removed.
+
+        :param str path: Absolute path of a deleted directory.
+        :return: None
+        """
+        for full_path in [path] + self._watched_subtree(path):
+            if full_path in self._watches:
+                self._del_watch_keys(full_path)
+            self._recursive_watches.pop(full_path, None)
+
+    def _move_subtree(self, old_path: str, new_path: str) -> None:
+        """Re-key tracked watches after a watched directory was renamed.
+
+        Kernel watches follow the directory, only the paths they are tracked under change.
+
+        :param str old_path: Absolute path the directory was moved from.
+        :param str new_path: Absolute path the directory was moved to.
+        :return: None
+        """
+        for full_path in [old_path] + self._watched_subtree(old_path):
+            moved_path = new_path + full_path[len(old_path) :]
+            if full_path in self._watches:
+                wd: int = self._watches[full_path]
+                watch_mask: Optional[int] = self._watch_masks.get(full_path)
+                kernel_mask: Optional[int] = self._kernel_masks.get(wd)
+                self._del_watch_keys(full_path)
+                self._add_watch_keys(wd, moved_path, kernel_mask)
+                if watch_mask is not None:
+                    self._watch_masks[moved_path] = watch_mask
+            if full_path in self._recursive_watches:
+                self._recursive_watches[moved_path] = self._recursive_watches.pop(
+                    full_path
+                )
+
+    def _prune_moved_subtree(self, path: str) -> None:
+        """Remove watches a renamed directory's new place in a recursive watch leaves out.
+
+        The moved tree was watched by the rules of its old path, under the new one it or some
+        of its subdirectories may be excluded or too deep.
+
+        :param str path: Absolute path the directory was moved to.
+        :return: None
+        """
+        for watched, _ in list(self._watches.subtree_items(path)):
+            # Already gone if below a directory pruned before it.
+            if watched in self._watches and self._prunes(watched):
+                self.del_watch(watched)
+
+    def _watch_new_directory(
+        self, path: str, event_mask: InotifyMasks
+    ) -> Iterator["InotifyEvent"]:
+        """Watch a directory that appeared inside a recursive watch.
+
+        Anything created in the directory before its watch existed produced no events, so its
+        current contents are reported as synthetic ``IN_CREATE`` events, recursing into
+        subdirectories.  Directories the recursive watch prunes are not watched.
+
+        :param str path: Absolute path of the new directory.
+        :param InotifyMasks event_mask: Event mask of the covering recursive watch.
+        :return iterator: Synthetic ``InotifyEvent`` objects for existing directory entries.
+        """
+        if path in self._watches or self._prunes(path):
+            return
+        kernel_mask: int = self._kernel_mask(path, event_mask.value, subtree=True)
+        try:
+            wd: int = inotify_add_watch(self.inotify_fd, os.fsencode(path), kernel_mask)
+            directory_entries = list(os.scandir(path))
+        except OSError:
+            # Removed again before we got to it, its delete event is still to come.
+            return
+        self._add_watch_keys(wd, path, kernel_mask)
+        for directory_entry in directory_entries:
+            entry_mask: int = _IN_CREATE
+            is_dir: bool = directory_entry.is_dir(follow_symlinks=False)
+            if is_dir:
+                entry_mask |= _IN_ISDIR
+            yield InotifyEvent(wd, entry_mask, 0, os.fsencode(directory_entry.name))
+            if is_dir:
+                yield from self._watch_new_directory(directory_entry.path, event_mask)
+
+    def _watch_missed_directories(
+        self, path: str, event_mask: InotifyMasks
+    ) -> Iterator["InotifyEvent"]:
+        """Watch subdirectories of a moved directory that were missed before it moved.
+
+        A directory created just before its parent was renamed cannot be watched under the old
+        path, its ``IN_CREATE`` is read only after the rename.  Every watched directory of the
+        moved tree is rescanned for subdirectories without a watch.
+
+        :param str path: Absolute path the directory was moved to.
+        :param InotifyMasks event_mask: Event mask of the covering recursive watch.
+        :return iterator: Synthetic ``InotifyEvent`` objects for the missed directories' entries.
+        """
+        for directory, _ in self._watches.subtree_items(path):
+            try:
+                directory_entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for directory_entry in directory_entries:
+                if (
+                    directory_entry.is_dir(follow_symlinks=False)
+                    and directory_entry.path not in self._watches
+                ):
+                    yield from self._watch_new_directory(
+                        directory_entry.path, event_mask
+                    )
+
+    def _track_directory_event(
+        self, inotify_event: "InotifyEvent"
+    ) -> Iterator["InotifyEvent"]:
+        """Grow and shrink recursive watches as directories are created, moved and deleted.
+
+        :param InotifyEvent inotify_event: Event with ``IN_ISDIR`` set.
+        :return iterator: Synthetic events for the contents of newly watched directories.
+        """
+        parent: Optional[str] = self._rev_watches.get(inotify_event.wd)
+        if parent is None or not inotify_event.file_name:
+            return
+        event_mask = self._recursive_mask_for(parent)
+        if event_mask is None:
+            return
+        path = os.path.join(parent, os.fsdecode(inotify_event.file_name))
+        if inotify_event.is_moved_from:
+            self._pending_moves[inotify_event.cookie] = (path, self._read_count)
+        elif inotify_event.is_moved_to:
+            pending_move: Optional[Tuple[str, int]] = self._pending_moves.pop(
+                inotify_event.cookie, None
+            )
+            if pending_move is not None:
+                self._move_subtree(pending_move[0], path)
+                self._prune_moved_subtree(path)
+                yield from self._watch_missed_directories(path, event_mask)
+            else:
+                self._expire_pending_move_from(path)
+                yield from self._watch_new_directory(path, event_mask)
+        elif inotify_event.is_create:
+            self._expire_pending_move_from(path)
+            yield from self._watch_new_directory(path, event_mask)
+        elif inotify_event.is_delete:
+            self._forget_subtree(path)
+
+    def _reap_watch(self, inotify_event: "InotifyEvent") -> None:
+        """Forget a watch the kernel has dropped.
+
+        The kernel sends ``IN_IGNORED`` whenever a watch goes away: removed by us, its
+        file/directory deleted (after ``IN_DELETE_SELF``), its filesystem unmounted or an
+        ``IN_ONESHOT`` watch having fired.  Left in the tables the watch descriptor would map
+        events to the wrong path once the kernel reuses it.
+
+        :param InotifyEvent inotify_event: ``IN_IGNORED`` or ``IN_DELETE_SELF`` event.
+        :return: None
+        """
+        wd: int = inotify_event.wd
+        if inotify_event.is_ignored and wd in self._removed_wds:
+            # Acknowledges our own inotify_rm_watch, the tables are already up to date.
+            self._removed_wds.discard(wd)
+            return
+        path: Optional[str] = self._rev_watches.get(wd)
+        if path is None:
+            return
+        if self._watches.get(path) == wd:
+            self._del_watch_keys(path)
+            self._recursive_watches.pop(path, None)
+            self.recursive = bool(self._recursive_watches)
+        else:
+            del self._rev_watches[wd]
+            self._path_cache.pop(wd, None)
+            self._kernel_masks.pop(wd, None)
+        self.reaped_watches += 1
+
+    def _expire_pending_moves(self) -> None:
+        """Stop watching directories moved out of a recursive watch, called after every read.
+
+        A directory moved within the watched tree produces ``IN_MOVED_FROM`` and ``IN_MOVED_TO``
+        back to back, but a read can end between the two.  Anything still unpaired at the end of
+        the read after its own was moved elsewhere.
+
+        :return: None
+        """
+        expired_cookies = [
+            cookie
+            for cookie, (_, read_count) in self._pending_moves.items()
+            if read_count != self._read_count
+        ]
+        for cookie in expired_cookies:
+            path, _ = self._pending_moves.pop(cookie)
+            if path in self._watches:
+                self.del_watch(path)
+        self._read_count += 1
+
+    def _expire_pending_move_from(self, path: str) -> None:
+        """Stop watching a directory moved away from a path another directory now takes.
+
+        :param str path: Absolute path of the new directory.
+        :return: None
+        """
+        for cookie, (old_path, _) in list(self._pending_moves.items()):
+            if old_path == path:
+                del self._pending_moves[cookie]
+                if path in self._watches:
+                    self.del_watch(path)
+
+
+@functools.lru_cache(maxsize=512)
+def decode_mask(mask: int) -> InotifyMasks:
+    """Build the ``InotifyMasks`` flag for a raw event mask.
+
+    ``Flag`` construction is slow but real world masks come from a small set of combinations,
+    so flags are memoised.
+
+    :param int mask: Raw event mask.
+    :return InotifyMasks: Flag for ``mask``.
+    """
+    return InotifyMasks(mask)
+
+
+def _mask_value(mask: Union[InotifyMasks, int]) -> int:
+    """Accept an event mask as either an ``InotifyMasks`` flag or a raw integer.
+
+    :param mask: Event mask.
+    :return int: Raw event mask.
+    """
+    return getattr(mask, "value", mask)
+
+
+@attr.s(auto_attribs=True, slots=True, repr=False)
 class InotifyEvent:
     """Unpacked inotify event bytes.
 
+    Slotted and storing the raw event mask, the ``InotifyMasks`` flag is only built when
+    :py:attr:`mask` is read.  ``mask`` may be passed as either a flag or an integer.
+
     :ivar int wd: Watch file descriptor.
     :ivar InotifyMasks mask: Inotify event mask.
     :ivar int cookie: Inotify event cookie if applicable.
     :ivar bytes file_name: File path associated with event.
+    :ivar str path: Absolute path of the file/directory the event is for, if resolved (see
+        :py:class:`Watcher`).
     """
 
     wd: int = attr.ib()
-    mask: InotifyMasks = attr.ib()
+    _mask: int = attr.ib(converter=_mask_value)
     cookie: int = attr.ib()
     file_name: bytes = attr.ib()
+    path: Optional[str] = attr.ib(default=None)
+
+    def __repr__(self) -> str:
+        fields = "wd={!r}, mask={!r}, cookie={!r}, file_name={!r}".format(
+            self.wd, self.mask, self.cookie, self.file_name
+        )
+        if self.path is not None:
+            fields += ", path={!r}".format(self.path)
+        return "InotifyEvent({})".format(fields)
+
+    @property
+    def mask(self) -> InotifyMasks:
+        """Inotify event mask as an ``InotifyMasks`` flag."""
+        return decode_mask(self._mask)
+
+    @mask.setter
+    def mask(self, mask: Union[InotifyMasks, int]) -> None:
+        self._mask = _mask_value(mask)
+
+    @property
+    def raw_mask(self) -> int:
+        """Inotify event mask as the integer read from the kernel."""
+        return self._mask
+
+    @property
+    def is_dir(self) -> bool:
+        """Event is against a directory."""
+        return bool(self._mask & _IN_ISDIR)
+
+    @property
+    def is_access(self) -> bool:
+        """File was accessed."""
+        return bool(self._mask & _IN_ACCESS)
+
+    @property
+    def is_modify(self) -> bool:
+        """File was modified."""
+        return bool(self._mask & _IN_MODIFY)
+
+    @property
+    def is_attrib(self) -> bool:
+        """Metadata changed."""
+        return bool(self._mask & _IN_ATTRIB)
+
+    @property
+    def is_close_write(self) -> bool:
+        """Writable file was closed."""
+        return bool(self._mask & _IN_CLOSE_WRITE)
+
+    @property
+    def is_open(self) -> bool:
+        """File was opened."""
+        return bool(self._mask & _IN_OPEN)
+
+    @property
+    def is_moved_from(self) -> bool:
+        """File was moved from here."""
+        return bool(self._mask & _IN_MOVED_FROM)
+
+    @property
+    def is_moved_to(self) -> bool:
+        """File was moved here."""
+        return bool(self._mask & _IN_MOVED_TO)
+
+    @property
+    def is_move(self) -> bool:
+        """File was moved from or to here."""
+        return bool(self._mask & _IN_MOVE)
+
+    @property
+    def is_create(self) -> bool:
+        """File was created."""
+        return bool(self._mask & _IN_CREATE)
+
+    @property
+    def is_delete(self) -> bool:
+        """File was deleted."""
+        return bool(self._mask & _IN_DELETE)
+
+    @property
+    def is_delete_self(self) -> bool:
+        """Watched file/directory itself was deleted."""
+        return bool(self._mask & _IN_DELETE_SELF)
+
+    @property
+    def is_move_self(self) -> bool:
+        """Watched file/directory itself was moved."""
+        return bool(self._mask & _IN_MOVE_SELF)
+
+    @property
+    def is_ignored(self) -> bool:
+        """Watch was removed."""
+        return bool(self._mask & _IN_IGNORED)
+
+    @property
+    def is_overflow(self) -> bool:
+        """Kernel event queue overflowed."""
+        return bool(self._mask & _IN_Q_OVERFLOW)
+
+
+@attr.s(auto_attribs=True, slots=True)
+class MoveEvent:
+    """A rename, paired from its ``IN_MOVED_FROM`` and ``IN_MOVED_TO`` events by cookie.
+
+    :ivar InotifyEvent src: The ``IN_MOVED_FROM`` event, where the file was moved from.
+    :ivar InotifyEvent dst: The ``IN_MOVED_TO`` event, where the file was moved to.
+    """
+
+    src: InotifyEvent = attr.ib()
+    dst: InotifyEvent = attr.ib()
+
+    @property
+    def cookie(self) -> int:
+        """Cookie shared by both halves of the move."""
+        return self.src.cookie
+
+
+@attr.s(auto_attribs=True, slots=True)
+class OverflowEvent:
+    """The kernel event queue overflowed and events were lost, replaces ``IN_Q_OVERFLOW``.
+
+    :ivar bool rescan: Synthetic events standing in for the lost ones follow, see
+        :py:attr:`OverflowPolicy.RESCAN`.
+    """
+
+    rescan: bool = attr.ib(default=False)
+
+
+class OverflowPolicy(Enum):
+    """What a :py:class:`Watcher` does when the kernel event queue overflows."""
+
+    #: Deliver the ``IN_Q_OVERFLOW`` event as read.
+    RAW = "raw"
+    #: Deliver an :py:class:`OverflowEvent` instead.
+    SIGNAL = "signal"
+    #: Deliver an :py:class:`OverflowEvent`, then rescan every watch and deliver synthetic
+    #: ``IN_CREATE``, ``IN_MODIFY`` and ``IN_DELETE`` events for whatever changed.  Reading every
+    #: directory would flood the queue with ``IN_OPEN``, ``IN_ACCESS`` and ``IN_CLOSE_NOWRITE``
+    #: events, so watches stop asking for those (see :py:data:`RESCAN_SUPPRESSED_MASK`).  Create
+    #: the watcher before adding recursive watches, their walks read every directory too.
+    RESCAN = "rescan"
+
+
+@attr.s(auto_attribs=True, slots=True)
+class EventBatch:
+    """Events from a single read stored as columns, without an object per event.
+
+    Row ``i`` of every column describes one event, its file name is
+    ``buffer[name_offset[i]:name_offset[i] + name_length[i]]``.
+
+    :ivar array wd: Watch descriptors, ``array("i")``.
+    :ivar array mask: Raw event masks, ``array("I")``.
+    :ivar array cookie: Inotify event cookies, ``array("I")``.
+    :ivar array name_offset: Offset of each file name in ``buffer``, ``array("I")``.
+    :ivar array name_length: Length of each file name without its NUL padding, ``array("I")``.
+    :ivar bytes buffer: Bytes read from the inotify file descriptor, followed by the names of any
+        synthetic events.
+    """
+
+    wd: array.array = attr.ib(factory=lambda: array.array("i"))
+    mask: array.array = attr.ib(factory=lambda: array.array("I"))
+    cookie: array.array = attr.ib(factory=lambda: array.array("I"))
+    name_offset: array.array = attr.ib(factory=lambda: array.array("I"))
+    name_length: array.array = attr.ib(factory=lambda: array.array("I"))
+    buffer: bytes = attr.ib(default=b"", repr=False)
+
+    def __len__(self) -> int:
+        return len(self.wd)
+
+    def file_name(self, index: int) -> bytes:
+        """File name of a single event.
+
+        :param int index: Row of the event.
+        :return bytes: File name associated with the event.
+        """
+        name_offset: int = self.name_offset[index]
+        return self.buffer[name_offset : name_offset + self.name_length[index]]
+
+    def file_names(self) -> List[bytes]:
+        """File names of every event, in row order.
+
+        :return list: File name associated with each event.
+        """
+        return [
+            self.buffer[name_offset : name_offset + name_length]
+            for name_offset, name_length in zip(self.name_offset, self.name_length)
+        ]
+
+    def _extend(self, inotify_events: Iterable[InotifyEvent]) -> None:
+        """Append events that were not read from the kernel, such as synthetic events.
+
+        :param iterable inotify_events: Events to append, their names are added to ``buffer``.
+        :return: None
+        """
+        extra_names = bytearray()
+        buffer_length: int = len(self.buffer)
+        for inotify_event in inotify_events:
+            self.wd.append(inotify_event.wd)
+            self.mask.append(inotify_event.raw_mask)
+            self.cookie.append(inotify_event.cookie)
+            self.name_offset.append(buffer_length + len(extra_names))
+            self.name_length.append(len(inotify_event.file_name))
+            extra_names += inotify_event.file_name
+        if extra_names:
+            self.buffer = bytes(self.buffer) + extra_names
+
+    def events(self) -> Iterator[InotifyEvent]:
+        """Materialise the batch as ``InotifyEvent`` objects.
+
+        :return iterator: One ``InotifyEvent`` per row.
+        """
+        return map(InotifyEvent, self.wd, self.mask, self.cookie, self.file_names())
+
+    def to_numpy(self) -> Dict[str, "numpy.ndarray"]:
+        """View the numeric columns as NumPy arrays, without copying.
+
+        Requires NumPy, install with ``pip install trio_inotify[numpy]``.
+
+        :return dict: ``numpy.ndarray`` per column name.
+        """
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("EventBatch.to_numpy requires numpy") from None
+        return {
+            column: numpy.frombuffer(getattr(self, column), dtype=dtype)
+            for column, dtype in (
+                ("wd", numpy.intc),
+                ("mask", numpy.uintc),
+                ("cookie", numpy.uintc),
+                ("name_offset", numpy.uintc),
+                ("name_length", numpy.uintc),
+            )
+        }
 
 
 @attr.s(auto_attribs=True)
 class Watcher:
     """Watch for inotify events on established watches.  Optionally pass events to an event handler.
+
+    With ``reuse_buffer`` set, events are read into a single preallocated buffer instead of
+    querying the pending length and allocating per read.  ``read_buffer_size`` defaults to
+    enough space to drain a full kernel queue (see :py:func:`max_queued_events`), capped at
+    ``MAX_DEFAULT_READ_BUFFER_SIZE``.
+
+    With ``coalesce_window`` set to a number of seconds, bursts of events for the same file are
+    merged into a single event per window, see :py:meth:`get_inotify_event`.
+
+    With ``pair_moves`` set, renames are delivered as a single :py:class:`MoveEvent`, see
+    :py:meth:`_pair_move_event`.
+
+    With ``resolve_paths`` set, each event's ``path`` is filled in with the absolute path it
+    refers to as of when it was read, see :py:meth:`WatchManager.resolve_path`.
+
+    ``overflow_policy`` decides how a kernel queue overflow is reported, see
+    :py:class:`OverflowPolicy` and :py:meth:`_rescan_watches`.
+
+    Changes made while nothing was watching can be caught up on from a snapshot saved by
+    :py:meth:`save_snapshot`, see :py:meth:`catch_up`.
+
+    ``event_handler`` is called with every event by :py:meth:`run`, along with handlers added
+    for matching paths with :py:meth:`add_handler`.
+
+    Events rejected by ``event_filter`` are skipped as they are decoded, see
+    :py:class:`EventFilter`.  A filter with an ``event_mask`` also subscribes to that mask (see
+    :py:meth:`WatchManager.subscribe`), narrowing the kernel watches of ``watch_manager`` for
+    anything else reading from it too, until :py:meth:`close` is called.
     """
 
     watch_manager: WatchManager = attr.ib()
     event_handler: Callable = attr.ib(default=None)
+    reuse_buffer: bool = attr.ib(default=False)
+    read_buffer_size: int = attr.ib(default=None)
+    coalesce_window: Optional[float] = attr.ib(default=None)
+    pair_moves: bool = attr.ib(default=False)
+    move_timeout: float = attr.ib(default=0.5)
+    max_pending_moves: int = attr.ib(default=1024)
+    resolve_paths: bool = attr.ib(default=False)
+    event_filter: Optional[EventFilter] = attr.ib(default=None)
+    overflow_policy: OverflowPolicy = attr.ib(
+        default=OverflowPolicy.RAW, converter=OverflowPolicy
+    )
+    _read_buffer: bytearray = attr.ib(init=False, default=None, repr=False)
+    _pending_moves: "OrderedDict[int, Tuple[float, InotifyEvent]]" = attr.ib(
+        init=False, factory=OrderedDict, repr=False
+    )
+    _snapshot: Optional[DirectorySnapshot] = attr.ib(
+        init=False, default=None, repr=False
+    )
+    _rescan_pending: bool = attr.ib(init=False, default=False, repr=False)
+    # Event masks of baseline entries delivered events changed, by name, per path.
+    _stale_entries: Dict[str, Dict[bytes, int]] = attr.ib(
+        init=False, factory=dict, repr=False
+    )
+    _queued_events: List[InotifyEvent] = attr.ib(init=False, factory=list, repr=False)
+    _router: HandlerRouter = attr.ib(init=False, factory=HandlerRouter, repr=False)
+    # Key of the subscription for event_filter's mask and of the rescan's suppressed events.
+    _filter_key: object = attr.ib(init=False, factory=object, repr=False, eq=False)
+
+    def __attrs_post_init__(self):
+        if self.reuse_buffer:
+            if self.read_buffer_size is None:
+                self.read_buffer_size = min(
+                    max_queued_events() * MAX_INOTIFY_EVENT_SIZE,
+                    MAX_DEFAULT_READ_BUFFER_SIZE,
+                )
+            if self.read_buffer_size < MAX_INOTIFY_EVENT_SIZE:
+                raise ValueError(
+                    "read_buffer_size must be at least {} bytes".format(
+                        MAX_INOTIFY_EVENT_SIZE
+                    )
+                )
+            self._read_buffer = bytearray(self.read_buffer_size)
+        if self.event_filter is not None and self.event_filter.event_mask is not None:
+            # Nothing outside the filter's mask gets through, no point queueing it.
+            self.watch_manager.subscribe(self._filter_key, self.event_filter.event_mask)
+        if self.overflow_policy is OverflowPolicy.RESCAN:
+            self.watch_manager.suppress_events(self._filter_key, RESCAN_SUPPRESSED_MASK)
+
+    def __enter__(self) -> "Watcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Remove the subscription made for ``event_filter`` and the events suppressed for
+        rescans, widening kernel watches again.
+
+        The watch manager is left open, it may be shared.
+
+        :return: None
+        """
+        self.watch_manager.unsubscribe(self._filter_key)
+        self.watch_manager.unsuppress_events(self._filter_key)
 
     def _get_fd_buffer_length(self) -> int:
         """Check length of inotify file descriptor.
@@ -141,50 +1579,798 @@ class Watcher:
         fcntl.ioctl(self.watch_manager.inotify_fd, ioctl_lib.FIONREAD, buffer)
         return buffer[0]
 
-    def _unpack_inotify_event(self, new_inotify_event) -> List[InotifyEvent]:
+    def _read_inotify_fd(self) -> Tuple[bytes, int]:
+        """Read pending events from the inotify file descriptor.
+
+        :raises BlockingIOError: No events are pending.
+        :return tuple: Buffer holding the events and the number of bytes read into it.
+        """
+        inotify_fd: int = self.watch_manager.inotify_fd
+        if self._read_buffer is not None:
+            return self._read_buffer, os.readv(inotify_fd, [self._read_buffer])
+        buffer_length: int = self._get_fd_buffer_length()
+        if not buffer_length:
+            raise BlockingIOError
+        new_inotify_event: bytes = os.read(inotify_fd, buffer_length)
+        return new_inotify_event, len(new_inotify_event)
+
+    def _iter_inotify_events(
+        self, new_inotify_event, buffer_length: int = None
+    ) -> Iterator[InotifyEvent]:
+        """Lazily unpack bytes from inotify file descriptor.
+
+        Event headers are unpacked in place from the read buffer, only file names are copied.
+        Events rejected by ``event_filter`` are skipped before being decoded any further.
+
+        :param bytes new_inotify_event:
+        :param int buffer_length: Number of valid bytes in the buffer, defaults to all of it.
+        :return iterator: ``InotifyEvent`` objects, decoded as they are requested.
+        """
+        unpack_header = INOTIFY_EVENT_HEADER.unpack_from
+        header_size: int = INOTIFY_EVENT_HEADER.size
+        if buffer_length is None:
+            buffer_length = len(new_inotify_event)
+        rejects = None if self.event_filter is None else self.event_filter.rejects
+        paths: Dict[int, str] = self.watch_manager._rev_watches
+        i = 0
+        while i < buffer_length:
+            wd, mask, cookie, name_length = unpack_header(new_inotify_event, i)
+            file_name_start = i + header_size
+            file_name_end = file_name_start + name_length
+            # The kernel pads names with NULs up to an alignment boundary.
+            name_end = new_inotify_event.find(b"\0", file_name_start, file_name_end)
+            if name_end != -1:
+                file_name_end = name_end
+            i += header_size + name_length
+            if (
+                rejects is not None
+                and wd >= 0
+                and rejects(
+                    wd, mask, new_inotify_event, file_name_start, file_name_end, paths
+                )
+            ):
+                if mask & _TRACKED_EVENTS:
+                    self._track_rejected_event(
+                        wd,
+                        mask,
+                        cookie,
+                        bytes(new_inotify_event[file_name_start:file_name_end]),
+                    )
+                continue
+            # bytes() is a no-op on bytes but detaches names from a reused bytearray.
+            yield InotifyEvent(
+                wd,
+                mask,
+                cookie,
+                bytes(new_inotify_event[file_name_start:file_name_end]),
+            )
+
+    def _build_event_batch(
+        self, new_inotify_event, buffer_length: int = None
+    ) -> EventBatch:
+        """Unpack bytes from inotify file descriptor into columns.
+
+        Events that change the watch tables are still tracked, any synthetic events this
+        produces are appended after the events read.
+
+        :param bytes new_inotify_event:
+        :param int buffer_length: Number of valid bytes in the buffer, defaults to all of it.
+        :return EventBatch: Every event from the buffer.
+        """
+        if buffer_length is None:
+            buffer_length = len(new_inotify_event)
+        if self._read_buffer is not None:
+            # Names must outlive the reused read buffer.
+            new_inotify_event = bytes(memoryview(new_inotify_event)[:buffer_length])
+        event_batch = EventBatch(buffer=new_inotify_event)
+        wds, masks, cookies = event_batch.wd, event_batch.mask, event_batch.cookie
+        name_offsets, name_lengths = event_batch.name_offset, event_batch.name_length
+        synthetic_events: List[InotifyEvent] = []
+        unpack_header = INOTIFY_EVENT_HEADER.unpack_from
+        header_size: int = INOTIFY_EVENT_HEADER.size
+        rejects = None if self.event_filter is None else self.event_filter.rejects
+        paths: Dict[int, str] = self.watch_manager._rev_watches
+        refresh_snapshot = self._snapshot_refresher()
+        i = 0
+        while i < buffer_length:
+            wd, mask, cookie, name_length = unpack_header(new_inotify_event, i)
+            file_name_start = i + header_size
+            i = file_name_start + name_length
+            name_end = new_inotify_event.find(b"\0", file_name_start, i)
+            if name_end != -1:
+                name_length = name_end - file_name_start
+            if (
+                rejects is not None
+                and wd >= 0
+                and rejects(
+                    wd,
+                    mask,
+                    new_inotify_event,
+                    file_name_start,
+                    file_name_start + name_length,
+                    paths,
+                )
+            ):
+                if mask & _TRACKED_EVENTS:
+                    self._track_rejected_event(
+                        wd,
+                        mask,
+                        cookie,
+                        new_inotify_event[
+                            file_name_start : file_name_start + name_length
+                        ],
+                    )
+                continue
+            wds.append(wd)
+            masks.append(mask)
+            cookies.append(cookie)
+            name_offsets.append(file_name_start)
+            name_lengths.append(name_length)
+            if refresh_snapshot is not None:
+                refresh_snapshot(
+                    wd,
+                    mask,
+                    new_inotify_event[file_name_start : file_name_start + name_length],
+                )
+            if mask & _TRACKED_EVENTS:
+                synthetic_events.extend(
+                    self._track_inotify_event(
+                        InotifyEvent(
+                            wd,
+                            mask,
+                            cookie,
+                            new_inotify_event[
+                                file_name_start : file_name_start + name_length
+                            ],
+                        )
+                    )
+                )
+            elif mask & _IN_Q_OVERFLOW:
+                self._rescan_pending = self.overflow_policy is OverflowPolicy.RESCAN
+        self.watch_manager._expire_pending_moves()
+        if refresh_snapshot is not None:
+            for synthetic_event in synthetic_events:
+                refresh_snapshot(
+                    synthetic_event.wd,
+                    synthetic_event.raw_mask,
+                    synthetic_event.file_name,
+                )
+        event_batch._extend(synthetic_events)
+        return event_batch
+
+    def _unpack_inotify_event(
+        self, new_inotify_event, buffer_length: int = None
+    ) -> List[InotifyEvent]:
         """Unpack bytes from inotify file descriptor.
 
         :param bytes new_inotify_event:
+        :param int buffer_length: Number of valid bytes in the buffer, defaults to all of it.
         :return list inotify_events:
         """
+        return list(self._iter_inotify_events(new_inotify_event, buffer_length))
 
-        inotify_events: List[InotifyEvent] = []
-        event_struct_size: int = inotify_ffi.sizeof("struct inotify_event")
-        string_buffer = inotify_ffi.new("char[]", len(new_inotify_event))
-        string_buffer[0 : len(new_inotify_event)] = new_inotify_event
-        i = 0
-        while i < len(string_buffer):
-            inotify_event = inotify_ffi.cast(
-                "struct inotify_event *", string_buffer[i : i + event_struct_size]
+    def _unpaired_move_event(self, inotify_event: InotifyEvent) -> InotifyEvent:
+        """Turn half of a move whose other half never arrived into a delete or create.
+
+        :param InotifyEvent inotify_event: ``IN_MOVED_FROM`` or ``IN_MOVED_TO`` event.
+        :return InotifyEvent: ``IN_DELETE`` or ``IN_CREATE`` event respectively.
+        """
+        if inotify_event.is_moved_from:
+            moved, replacement = _IN_MOVED_FROM, _IN_DELETE
+        else:
+            moved, replacement = _IN_MOVED_TO, _IN_CREATE
+        return attr.evolve(
+            inotify_event,
+            mask=(inotify_event.raw_mask & ~moved) | replacement,
+            cookie=0,
+        )
+
+    def _expire_move_events(self) -> Iterator[InotifyEvent]:
+        """Give up on ``IN_MOVED_FROM`` events waiting longer than ``move_timeout``.
+
+        :return iterator: ``IN_DELETE`` events for the moves given up on.
+        """
+        now: float = trio.current_time()
+        while self._pending_moves:
+            cookie, (deadline, inotify_event) = next(iter(self._pending_moves.items()))
+            if deadline > now:
+                break
+            del self._pending_moves[cookie]
+            yield self._unpaired_move_event(inotify_event)
+
+    def _pair_move_event(
+        self, inotify_event: InotifyEvent
+    ) -> Iterator[Union[InotifyEvent, MoveEvent]]:
+        """Pair ``IN_MOVED_FROM`` and ``IN_MOVED_TO`` events into :py:class:`MoveEvent` objects.
+
+        ``IN_MOVED_FROM`` events are held back for up to ``move_timeout`` seconds waiting for the
+        matching ``IN_MOVED_TO``, at most ``max_pending_moves`` at a time.  A file moved out of
+        the watched directories never gets its second half and is reported as ``IN_DELETE``, a
+        file moved in from elsewhere is reported as ``IN_CREATE``.
+
+        :param InotifyEvent inotify_event: Any event.
+        :return iterator: Events ready to be delivered.
+        """
+        if not inotify_event.is_move:
+            yield inotify_event
+        elif inotify_event.is_moved_from:
+            if len(self._pending_moves) >= self.max_pending_moves:
+                _, (_, oldest_event) = self._pending_moves.popitem(last=False)
+                yield self._unpaired_move_event(oldest_event)
+            self._pending_moves[inotify_event.cookie] = (
+                trio.current_time() + self.move_timeout,
+                inotify_event,
             )
-            file_name_start = i + event_struct_size
-            file_name_end = file_name_start + inotify_event.len
-            file_name = inotify_ffi.string(string_buffer[file_name_start:file_name_end])
-            inotify_events.append(
-                InotifyEvent(
-                    inotify_event.wd,
-                    self.watch_manager.inotify_event_flags(inotify_event.mask),
-                    inotify_event.cookie,
-                    file_name,
+        else:
+            pending_move = self._pending_moves.pop(inotify_event.cookie, None)
+            if pending_move is None:
+                yield self._unpaired_move_event(inotify_event)
+            else:
+                yield MoveEvent(pending_move[1], inotify_event)
+
+    def _track_inotify_event(
+        self, inotify_event: InotifyEvent
+    ) -> Iterator[InotifyEvent]:
+        """Update the watch tables for an event with any of ``_TRACKED_EVENTS`` set.
+
+        :param InotifyEvent inotify_event: Event read from the kernel.
+        :return iterator: Synthetic events resulting from the update.
+        """
+        if inotify_event.raw_mask & (_IN_IGNORED | _IN_DELETE_SELF):
+            self.watch_manager._reap_watch(inotify_event)
+            if self.event_filter is not None and inotify_event.is_ignored:
+                self.event_filter.forget(inotify_event.wd)
+        elif inotify_event.is_dir:
+            yield from self.watch_manager._track_directory_event(inotify_event)
+
+    def _track_rejected_event(
+        self, wd: int, mask: int, cookie: int, file_name: bytes
+    ) -> None:
+        """Keep the watch tables up to date for an event ``event_filter`` rejected.
+
+        Synthetic events for the contents of a rejected directory are dropped along with it.
+
+        :param int wd: Watch descriptor of the event.
+        :param int mask: Raw event mask.
+        :param int cookie: Inotify event cookie.
+        :param bytes file_name: File name of the event.
+        :return: None
+        """
+        for _ in self._track_inotify_event(InotifyEvent(wd, mask, cookie, file_name)):
+            pass
+
+    def _process_inotify_events(
+        self, inotify_events: Iterable[InotifyEvent]
+    ) -> Iterator[Union[InotifyEvent, MoveEvent, OverflowEvent]]:
+        """Keep watches up to date with the events from one read.
+
+        Directories created or moved into a recursive watch are watched, along with their
+        existing contents which are reported as synthetic ``IN_CREATE`` events following the
+        directory's own event.  Directories deleted or moved out of it stop being watched.
+
+        :param iterable inotify_events: Events decoded from one read.
+        :return iterator: The events, interleaved with any synthetic events.
+        """
+        resolve_path = self.watch_manager.resolve_path if self.resolve_paths else None
+        refresh_snapshot = self._snapshot_refresher()
+        for inotify_event in inotify_events:
+            if (
+                inotify_event.raw_mask & _IN_Q_OVERFLOW
+                and self.overflow_policy is not OverflowPolicy.RAW
+            ):
+                self._rescan_pending = self.overflow_policy is OverflowPolicy.RESCAN
+                yield OverflowEvent(rescan=self._rescan_pending)
+                continue
+            if refresh_snapshot is not None:
+                refresh_snapshot(
+                    inotify_event.wd, inotify_event.raw_mask, inotify_event.file_name
                 )
-            )
-            i += event_struct_size + inotify_event.len
-        return inotify_events
+            if resolve_path is not None:
+                inotify_event.path = resolve_path(
+                    inotify_event.wd, inotify_event.file_name
+                )
+            if self.pair_moves:
+                yield from self._pair_move_event(inotify_event)
+            else:
+                yield inotify_event
+            if inotify_event.raw_mask & _TRACKED_EVENTS:
+                for synthetic_event in self._track_inotify_event(inotify_event):
+                    if refresh_snapshot is not None:
+                        refresh_snapshot(
+                            synthetic_event.wd,
+                            synthetic_event.raw_mask,
+                            synthetic_event.file_name,
+                        )
+                    if resolve_path is not None:
+                        synthetic_event.path = resolve_path(
+                            synthetic_event.wd, synthetic_event.file_name
+                        )
+                    yield synthetic_event
+        self.watch_manager._expire_pending_moves()
+        yield from self._expire_move_events()
 
-    async def get_inotify_event(self) -> List[InotifyEvent]:
-        """Read bytes from inotify descriptor if available.
+    def _snapshot_refresher(self) -> Optional[Callable[[int, int, bytes], None]]:
+        """Pick what keeps the rescan baseline up to date with delivered events.
+
+        :return callable: :py:meth:`_mark_stale_entry`, ``None`` without a baseline to keep.
+        """
+        if self.overflow_policy is OverflowPolicy.RESCAN and self._snapshot is not None:
+            return self._mark_stale_entry
+        return None
+
+    def _mark_stale_entry(self, wd: int, mask: int, file_name: bytes) -> None:
+        """Note the rescan baseline entry a delivered event changed, to be refreshed by
+        :py:meth:`_refresh_stale_entries`.
+
+        :param int wd: Watch descriptor of the event.
+        :param int mask: Raw event mask.
+        :param bytes file_name: File name of the event, empty for the watched path itself.
+        :return: None
+        """
+        path: Optional[str] = self.watch_manager._rev_watches.get(wd)
+        if path is None:
+            return
+        stale_names: Optional[Dict[bytes, int]] = self._stale_entries.get(path)
+        if stale_names is None:
+            self._stale_entries[path] = stale_names = {}
+        stale_names[file_name] = stale_names.get(file_name, 0) | mask
+
+    async def _refresh_stale_entries(self) -> None:
+        """Bring the rescan baseline up to date with the events delivered since the last read,
+        in a worker thread, so a rescan only reports what was lost.
 
-        :return list: One or more ``NamedTuple`` objects containing event data.
+        :return: None
         """
-        await trio.hazmat.checkpoint_if_cancelled()
+        if not self._stale_entries:
+            return
+        stale_entries, self._stale_entries = self._stale_entries, {}
+        await trio.to_thread.run_sync(self._snapshot.refresh_entries, stale_entries)
+
+    def _next_move_deadline(self) -> float:
+        """Time by which the oldest held back ``IN_MOVED_FROM`` event must be delivered.
+
+        :return float: Deadline on the trio clock, infinite if no events are held back.
+        """
+        if not self._pending_moves:
+            return math.inf
+        return next(iter(self._pending_moves.values()))[0]
+
+    async def _wait_inotify_read(self) -> Tuple[bytes, int]:
+        """Wait for the inotify file descriptor to become readable and read it.
+
+        :return tuple: Buffer holding the events and the number of bytes read into it.
+        """
+        if self.overflow_policy is OverflowPolicy.RESCAN and self._snapshot is None:
+            # Baseline to rescan against, taken before the first read can overflow.
+            self._snapshot = await take_snapshot(self.watch_manager._watches)
+        await self._refresh_stale_entries()
+        await trio.lowlevel.checkpoint_if_cancelled()
         while True:
             try:
-                new_inotify_event: bytes = os.read(
-                    self.watch_manager.inotify_fd, self._get_fd_buffer_length()
-                )
+                new_inotify_event, buffer_length = self._read_inotify_fd()
             except BlockingIOError:
                 pass
             else:
-                await trio.hazmat.cancel_shielded_checkpoint()
-                return self._unpack_inotify_event(new_inotify_event)
-            await trio.hazmat.wait_readable(self.watch_manager.inotify_fd)
+                await trio.lowlevel.cancel_shielded_checkpoint()
+                return new_inotify_event, buffer_length
+            await trio.lowlevel.wait_readable(self.watch_manager.inotify_fd)
+
+    async def _rescan_watches(self) -> List[Union[InotifyEvent, MoveEvent]]:
+        """Make up for events lost to a queue overflow.
+
+        Every watched file/directory is scanned in a worker thread and compared against the
+        snapshot taken before the first read (or the previous rescan), changes are delivered as
+        synthetic events without cookies, see :py:meth:`DirectorySnapshot.diff`.  Delivered
+        events keep that snapshot up to date (see :py:meth:`_refresh_stale_entries`), so only
+        changes that were lost are reported.  Directories moved into a watch since then are
+        only compared from the next rescan on.
+
+        The rescan stays pending until it completes, a cancelled one is run again.
+
+        :return list: Synthetic events, processed as if read from the kernel.
+        """
+        if self._snapshot is None:
+            self._snapshot = await take_snapshot(self.watch_manager._watches)
+            inotify_events = []
+        else:
+            await self._refresh_stale_entries()
+            inotify_events = await self._diff_watches(self._snapshot)
+        self._rescan_pending = False
+        return inotify_events
+
+    async def _diff_watches(
+        self, previous_snapshot: DirectorySnapshot, max_workers: int = 8
+    ) -> List[Union[InotifyEvent, MoveEvent]]:
+        """Compare every watched file/directory against a snapshot, which the current state
+        then replaces as the rescan baseline.
+
+        Directories created since the snapshot have their contents reported as well, see
+        :py:meth:`_created_directory_events`.
+
+        :param DirectorySnapshot previous_snapshot: Snapshot to compare against.
+        :param int max_workers: Largest number of threads scanning at once.
+        :return list: Synthetic events for the changes, processed as if read from the kernel.
+        """
+        watches: PathTrie = self.watch_manager._watches
+        self._snapshot, changes = await diff_snapshot(
+            previous_snapshot, watches, max_workers=max_workers
+        )
+        synthetic_events: List[InotifyEvent] = []
+        for path, file_name, mask in changes:
+            wd: Optional[int] = watches.get(path)
+            if wd is None:
+                continue
+            synthetic_events.append(InotifyEvent(wd, mask, 0, file_name))
+            if mask & _IN_CREATE and mask & _IN_ISDIR:
+                synthetic_events.extend(
+                    self._created_directory_events(
+                        os.path.join(path, os.fsdecode(file_name)), previous_snapshot
+                    )
+                )
+        return list(self._process_inotify_events(synthetic_events))
+
+    def _created_directory_events(
+        self, path: str, previous_snapshot: DirectorySnapshot
+    ) -> Iterator[InotifyEvent]:
+        """Report the contents of a directory created since a snapshot.
+
+        A directory that is already watched, for instance by a recursive watch added after a
+        restart, is not scanned again when its ``IN_CREATE`` is processed.  Its contents are
+        reported from the current snapshot instead, as synthetic ``IN_CREATE`` events
+        following the directory's own, recursing into watched subdirectories.  Directories
+        without a watch are left to :py:meth:`WatchManager._watch_new_directory`.
+
+        :param str path: Absolute path of the new directory.
+        :param DirectorySnapshot previous_snapshot: Snapshot the directory is not in.
+        :return iterator: Synthetic ``InotifyEvent`` objects for the directory's entries.
+        """
+        wd: Optional[int] = self.watch_manager._watches.get(path)
+        entries = self._snapshot.directories.get(path)
+        if wd is None or entries is None or path in previous_snapshot.directories:
+            return
+        for file_name, entry in entries.items():
+            yield InotifyEvent(
+                wd, _IN_CREATE | (_IN_ISDIR if entry.is_dir else 0), 0, file_name
+            )
+            if entry.is_dir:
+                yield from self._created_directory_events(
+                    os.path.join(path, os.fsdecode(file_name)), previous_snapshot
+                )
+
+    async def save_snapshot(self, snapshot_path: str, max_workers: int = 8) -> None:
+        """Record the current state of every watched file/directory to disk.
+
+        :param str snapshot_path: File to write, see :py:meth:`DirectorySnapshot.save`.
+        :param int max_workers: Largest number of threads scanning at once.
+        :return: None
+        """
+        snapshot = await take_snapshot(
+            self.watch_manager._watches, max_workers=max_workers
+        )
+        await trio.to_thread.run_sync(snapshot.save, snapshot_path)
+
+    async def catch_up(self, snapshot_path: str, max_workers: int = 8) -> int:
+        """Queue synthetic events for whatever changed since :py:meth:`save_snapshot` was called.
+
+        Call after adding watches and before reading events, for instance when restarting a
+        service that saved a snapshot on its way down.  Watches are scanned and diffed against
+        the snapshot in parallel worker threads, the resulting events are delivered ahead of
+        any read from the kernel.  Directories created since the snapshot have their whole
+        contents reported as created, other paths that were not in it are not compared.
+
+        :param str snapshot_path: File written by :py:meth:`save_snapshot`.
+        :param int max_workers: Largest number of threads scanning at once.
+        :raises ValueError: ``snapshot_path`` is not a snapshot.
+        :return int: Number of events queued.
+        """
+        previous_snapshot = await trio.to_thread.run_sync(
+            DirectorySnapshot.load, snapshot_path
+        )
+        inotify_events = await self._diff_watches(
+            previous_snapshot, max_workers=max_workers
+        )
+        self._queued_events.extend(inotify_events)
+        return len(inotify_events)
+
+    def _take_queued_events(self) -> List[Union[InotifyEvent, MoveEvent]]:
+        inotify_events, self._queued_events = self._queued_events, []
+        return inotify_events
+
+    async def _read_inotify_events(self) -> List[Union[InotifyEvent, MoveEvent]]:
+        """Wait for and unpack the events from a single read.
+
+        :return list: One or more ``InotifyEvent`` (or ``MoveEvent``) objects.
+        """
+        while True:
+            if self._rescan_pending:
+                # Run on the next call rather than with the read that overflowed, so its events
+                # are delivered even if the rescan is cancelled.
+                self._queued_events.extend(await self._rescan_watches())
+            if self._queued_events:
+                return self._take_queued_events()
+            with trio.move_on_at(self._next_move_deadline()) as cancel_scope:
+                new_inotify_event, buffer_length = await self._wait_inotify_read()
+            if cancel_scope.cancelled_caught:
+                inotify_events = list(self._expire_move_events())
+            else:
+                inotify_events = list(
+                    self._process_inotify_events(
+                        self._iter_inotify_events(new_inotify_event, buffer_length)
+                    )
+                )
+            # Reads holding nothing but moves waiting for their other half return nothing.
+            if inotify_events:
+                return inotify_events
+
+    async def get_event_batch(self) -> EventBatch:
+        """Read bytes from inotify descriptor if available, as columns.
+
+        For bulk consumers with no use for an object per event.  Watch tables are kept up to
+        date as usual, but events are neither coalesced nor paired into moves.  Overflows are
+        left as ``IN_Q_OVERFLOW`` rows, the synthetic events of a rescan are returned by the
+        next call if ``overflow_policy`` asks for one.
+
+        :return EventBatch: Every event from a single read.
+        """
+        if self._rescan_pending:
+            self._queued_events.extend(await self._rescan_watches())
+        if self._queued_events:
+            event_batch = EventBatch()
+            event_batch._extend(self._take_queued_events())
+            return event_batch
+        new_inotify_event, buffer_length = await self._wait_inotify_read()
+        return self._build_event_batch(new_inotify_event, buffer_length)
+
+    @staticmethod
+    def _coalesce_inotify_events(
+        inotify_events: Iterable[InotifyEvent],
+        coalesced_events: List[InotifyEvent],
+        events_by_name: Dict[Tuple[int, bytes], InotifyEvent],
+    ) -> None:
+        """Merge events into ``coalesced_events``, one per ``(wd, file_name)``.
+
+        Masks of repeated events are ORed into the first one seen.  Events carrying a cookie or
+        not tied to a watch (overflows) are passed through unmerged.  Moves and deletes
+        end a name's merged event, so events for a file recreated under it start a new one.
+
+        :param iterable inotify_events: Events to merge in.
+        :param list coalesced_events: Merged events, in order of first appearance.
+        :param dict events_by_name: Merged events keyed by ``(wd, file_name)``.
+        :return: None
+        """
+        for inotify_event in inotify_events:
+            if isinstance(inotify_event, MoveEvent):
+                # Both names change, later events for either start a new merged event.
+                for moved_event in (inotify_event.src, inotify_event.dst):
+                    events_by_name.pop((moved_event.wd, moved_event.file_name), None)
+                coalesced_events.append(inotify_event)
+                continue
+            if isinstance(inotify_event, OverflowEvent):
+                coalesced_events.append(inotify_event)
+                continue
+            event_key = (inotify_event.wd, inotify_event.file_name)
+            if inotify_event.cookie or inotify_event.wd < 0:
+                events_by_name.pop(event_key, None)
+                coalesced_events.append(inotify_event)
+                continue
+            coalesced_event = events_by_name.get(event_key)
+            if coalesced_event is None:
+                events_by_name[event_key] = coalesced_event = inotify_event
+                coalesced_events.append(inotify_event)
+            else:
+                coalesced_event.mask = coalesced_event.raw_mask | inotify_event.raw_mask
+            if coalesced_event.is_delete:
+                del events_by_name[event_key]
+
+    async def get_inotify_event(self) -> List[Union[InotifyEvent, MoveEvent]]:
+        """Read bytes from inotify descriptor if available.
+
+        With ``coalesce_window`` set, keeps reading for that many seconds after the first events
+        arrive and returns one event per file for the whole window, see
+        :py:meth:`_coalesce_inotify_events`.
+
+        :return list: One or more ``InotifyEvent`` (or ``MoveEvent``) objects containing event data.
+        """
+        inotify_events: List[InotifyEvent] = await self._read_inotify_events()
+        if self.coalesce_window is None:
+            return inotify_events
+        coalesced_events: List[InotifyEvent] = []
+        events_by_name: Dict[Tuple[int, bytes], InotifyEvent] = {}
+        self._coalesce_inotify_events(inotify_events, coalesced_events, events_by_name)
+        with trio.move_on_after(self.coalesce_window):
+            while True:
+                self._coalesce_inotify_events(
+                    await self._read_inotify_events(), coalesced_events, events_by_name
+                )
+        return coalesced_events
+
+    async def events(self) -> AsyncIterator[Union[InotifyEvent, MoveEvent]]:
+        """Yield events one at a time as they are decoded, forever.
+
+        The inotify file descriptor is only read again once every event from the previous read
+        has been consumed, so a slow consumer leaves pending events queued in the kernel rather
+        than as Python objects.  If the consumer falls far enough behind the kernel queue will
+        overflow, reported according to ``overflow_policy``.
+
+        With ``coalesce_window`` set, events are yielded once each window closes instead, as
+        returned by :py:meth:`get_inotify_event`.
+
+        :return async iterator: ``InotifyEvent`` objects.
+        """
+        while True:
+            if self.coalesce_window is not None:
+                for inotify_event in await self.get_inotify_event():
+                    yield inotify_event
+                continue
+            if self._rescan_pending:
+                self._queued_events.extend(await self._rescan_watches())
+            if self._queued_events:
+                for inotify_event in self._take_queued_events():
+                    yield inotify_event
+                continue
+            with trio.move_on_at(self._next_move_deadline()) as cancel_scope:
+                new_inotify_event, buffer_length = await self._wait_inotify_read()
+            if cancel_scope.cancelled_caught:
+                for inotify_event in self._expire_move_events():
+                    yield inotify_event
+                continue
+            for inotify_event in self._process_inotify_events(
+                self._iter_inotify_events(new_inotify_event, buffer_length)
+            ):
+                yield inotify_event
+
+    def add_handler(
+        self,
+        handler: Callable,
+        pattern: str = "**",
+        event_mask: Union[InotifyMasks, int, None] = None,
+    ) -> None:
+        """Have :py:meth:`run` call a handler for events on paths matching a glob pattern.
+
+        ``*.log`` or ``data_??.csv`` match file names in any watched directory, ``tmp/**`` or
+        ``**/*.py`` paths relative to the watched directory (the root of a recursive watch) and
+        ``/srv/*/access.log`` absolute paths.  Patterns are compiled into a routing table, so
+        finding the handlers for an event does not test every pattern, see
+        :py:class:`HandlerRouter`.
+
+        Handlers also subscribe to their events on the watch manager, so kernel watches stop
+        asking for events no handler wants, see :py:meth:`WatchManager.subscribe`.  This applies
+        to events read by other means too.
+
+        :param callable handler: Called with each matching event, sync or async.
+        :param str pattern: Glob pattern.
+        :param InotifyMasks event_mask: Only call ``handler`` for these events, all if ``None``.
+        :return: None
+        """
+        route: Route = self._router.add_route(handler, pattern, event_mask)
+        self.watch_manager.subscribe(route, route.mask, route.scope)
+
+    def _route_event(
+        self, inotify_event: Union[InotifyEvent, MoveEvent, OverflowEvent]
+    ) -> List[Route]:
+        """Find the handlers added with :py:meth:`add_handler` for an event.
+
+        A move goes to the handlers of either of its paths, overflows and other events without a
+        watch or path go to every handler.
+
+        :param InotifyEvent inotify_event: Any event.
+        :return list: Matching routes.
+        """
+        if isinstance(inotify_event, OverflowEvent):
+            return self._router.route(None, _IN_Q_OVERFLOW)
+        if isinstance(inotify_event, MoveEvent):
+            return list(
+                dict.fromkeys(
+                    self._route_event(inotify_event.src)
+                    + self._route_event(inotify_event.dst)
+                )
+            )
+        path: Optional[str] = inotify_event.path
+        if path is None and inotify_event.wd < 0:
+            return self._router.route(None, inotify_event.raw_mask)
+        if path is None:
+            path = self.watch_manager.resolve_path(
+                inotify_event.wd, inotify_event.file_name
+            )
+            if path is None:
+                return []
+        root: Optional[str] = None
+        if self._router.has_relative_routes:
+            root = self.watch_manager._watch_root(path)
+        return self._router.route(path, inotify_event.raw_mask, root)
+
+    @staticmethod
+    def _handler_key(
+        inotify_event: Union[InotifyEvent, MoveEvent, OverflowEvent]
+    ) -> Hashable:
+        """Key events must be handled in order within, one per watched file.
+
+        :param InotifyEvent inotify_event: Any event.
+        :return hashable: ``(wd, file_name)``, of the destination for a move.
+        """
+        if isinstance(inotify_event, MoveEvent):
+            inotify_event = inotify_event.dst
+        elif isinstance(inotify_event, OverflowEvent):
+            return None
+        return inotify_event.wd, inotify_event.file_name
+
+    async def run(
+        self,
+        limiter: Optional[trio.CapacityLimiter] = None,
+        max_pending_events: int = 1024,
+    ) -> None:
+        """Call ``event_handler`` and the handlers routed to with every event, forever.
+
+        Handlers run concurrently, at most as many at a time as ``limiter`` allows, but events
+        for the same file are handled one after another in the order they were read.  Async
+        handlers are awaited, anything else is run in a worker thread.  Reading stops once
+        ``max_pending_events`` events are waiting on or being handled, leaving further events
+        queued in the kernel until handlers catch up.
+
+        An exception raised by the handler cancels every other handler and is raised from here.
+
+        :param trio.CapacityLimiter limiter: Limits concurrent handler calls, defaults to a new
+            limiter of ``DEFAULT_HANDLER_CONCURRENCY`` tokens.
+        :param int max_pending_events: Largest number of events read but not yet handled.
+        :raises ValueError: No ``event_handler`` was given nor any handlers added.
+        :return: None
+        """
+        if self.event_handler is None and not self._router:
+            raise ValueError("Watcher.run requires an event_handler or added handlers")
+        default_routes: List[Route] = []
+        if self.event_handler is not None:
+            default_routes.append(
+                Route(
+                    self.event_handler,
+                    "**",
+                    is_async=inspect.iscoroutinefunction(self.event_handler),
+                )
+            )
+        if limiter is None:
+            limiter = trio.CapacityLimiter(DEFAULT_HANDLER_CONCURRENCY)
+        for route in default_routes:
+            # event_handler wants everything, whatever added handlers narrowed masks to.
+            self.watch_manager.subscribe(route)
+        pending_events = trio.Semaphore(max_pending_events)
+        handler_queues: Dict[Hashable, Deque[Tuple[InotifyEvent, List[Route]]]] = {}
+
+        async def handle_events(key: Hashable, handler_queue: Deque) -> None:
+            while handler_queue:
+                inotify_event, routes = handler_queue[0]
+                for route in routes:
+                    if route.is_async:
+                        async with limiter:
+                            await route.handler(inotify_event)
+                    else:
+                        await trio.to_thread.run_sync(
+                            route.handler, inotify_event, limiter=limiter
+                        )
+                handler_queue.popleft()
+                pending_events.release()
+            del handler_queues[key]
+
+        try:
+            async with trio.open_nursery() as nursery:
+                async for inotify_event in self.events():
+                    routes: List[Route] = default_routes
+                    if self._router:
+                        routes = default_routes + self._route_event(inotify_event)
+                        if not routes:
+                            continue
+                    await pending_events.acquire()
+                    key: Hashable = self._handler_key(inotify_event)
+                    handler_queue: Optional[Deque] = handler_queues.get(key)
+                    if handler_queue is None:
+                        handler_queues[key] = handler_queue = deque(
+                            [(inotify_event, routes)]
+                        )
+                        nursery.start_soon(handle_events, key, handler_queue)
+                    else:
+                        handler_queue.append((inotify_event, routes))
+        finally:
+            for route in default_routes:
+                self.watch_manager.unsubscribe(route)
+
+    def __aiter__(self) -> AsyncIterator[InotifyEvent]:
+        """Iterate over events with ``async for event in watcher``, see :py:meth:`events`."""
+        return self.events()
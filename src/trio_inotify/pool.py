@@ -0,0 +1,176 @@
+"""Spread watches over several inotify instances and read them as one stream
+"""
+import os
+import zlib
+import attr
+import trio
+from typing import Callable, Iterable, List, Optional, Union
+from trio_inotify.inotify import (
+    InotifyEvent,
+    InotifyMasks,
+    MoveEvent,
+    OverflowEvent,
+    WatchManager,
+    Watcher,
+)
+
+
+@attr.s(auto_attribs=True)
+class WatchManagerPool:
+    """Shard watches across ``shard_count`` :py:class:`WatchManager` instances.
+
+    Each :py:meth:`add_watch` call is placed on a shard chosen by hashing the first
+    ``prefix_depth`` components of its path, so watches under a common prefix share a kernel
+    queue.  A recursive watch keeps its whole tree on one shard, to spread a single large tree
+    add its subdirectories individually.
+
+    Watch descriptors are only unique per inotify instance, so events read through the pool carry
+    a pool wide watch descriptor instead (see :py:meth:`path_for_wd`).
+    """
+
+    shard_count: int = attr.ib(default=4)
+    prefix_depth: Optional[int] = attr.ib(default=2)
+    watcher_factory: Callable[[WatchManager], Watcher] = attr.ib(default=Watcher)
+    watch_managers: List[WatchManager] = attr.ib(init=False)
+    watchers: List[Watcher] = attr.ib(init=False)
+
+    @shard_count.validator
+    def _check_shard_count(self, attribute, value):
+        if value < 1:
+            raise ValueError("shard_count must be at least 1")
+
+    @watch_managers.default
+    def _create_watch_managers(self) -> List[WatchManager]:
+        return [WatchManager() for _ in range(self.shard_count)]
+
+    @watchers.default
+    def _create_watchers(self) -> List[Watcher]:
+        return [
+            self.watcher_factory(watch_manager) for watch_manager in self.watch_managers
+        ]
+
+    def __enter__(self) -> "WatchManagerPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def shard_for(self, path: str) -> int:
+        """Pick the shard a new watch on ``path`` is placed on.
+
+        :param str path: File/directory to watch.
+        :return int: Index into :py:attr:`watch_managers`.
+        """
+        prefix = os.path.abspath(path).strip("/").split("/")[: self.prefix_depth]
+        return zlib.crc32(os.fsencode("/".join(prefix))) % self.shard_count
+
+    def _shard_watching(self, path: str) -> int:
+        """Find the shard holding an existing watch on ``path``.
+
+        Subdirectories of a recursive watch live on their root's shard, which need not be the
+        shard their own prefix hashes to.
+
+        :param str path: Watched file/directory.
+        :raises KeyError: ``path`` is not watched by any shard.
+        :return int: Index into :py:attr:`watch_managers`.
+        """
+        path = os.path.abspath(path)
+        for index, watch_manager in enumerate(self.watch_managers):
+            if path in watch_manager._watches:
+                return index
+        raise KeyError(path)
+
+    def add_watch(
+        self,
+        path: str,
+        event_mask: InotifyMasks = None,
+        recursive: bool = False,
+        exclude: Iterable[str] = (),
+        max_depth: Optional[int] = None,
+    ) -> None:
+        """Add new watch on the shard ``path`` hashes to.
+
+        :param str path: File/directory to watch.
+        :param InotifyMasks event_mask: inotify events to watch for.
+        :param bool recursive: Include subdirectories/newly created directories.
+        :param iterable exclude: Glob patterns of subdirectories to leave out.
+        :param int max_depth: Deepest level of subdirectories to watch, default no limit.
+        :return: None
+        """
+        self.watch_managers[self.shard_for(path)].add_watch(
+            path,
+            event_mask=event_mask,
+            recursive=recursive,
+            exclude=exclude,
+            max_depth=max_depth,
+        )
+
+    def del_watch(self, path: str) -> None:
+        """Remove a watch from whichever shard holds it.
+
+        :param str path: File/directory to stop watching.
+        :return: None
+        """
+        self.watch_managers[self._shard_watching(path)].del_watch(path)
+
+    def path_for_wd(self, wd: int) -> str:
+        """Look up the watched path for a pool wide watch descriptor.
+
+        :param int wd: Watch descriptor from an event read through the pool.
+        :return str: Watched file/directory.
+        """
+        shard_wd, index = divmod(wd, self.shard_count)
+        return self.watch_managers[index]._rev_watches[shard_wd]
+
+    def _pool_event(
+        self, index: int, inotify_event: Union[InotifyEvent, MoveEvent, OverflowEvent]
+    ) -> Union[InotifyEvent, MoveEvent, OverflowEvent]:
+        """Translate a shard's event to pool wide watch descriptors.
+
+        :param int index: Shard the event was read from.
+        :param InotifyEvent inotify_event: Event as read from the shard.
+        :return InotifyEvent: Event with a pool wide watch descriptor.
+        """
+        if isinstance(inotify_event, MoveEvent):
+            return MoveEvent(
+                self._pool_event(index, inotify_event.src),
+                self._pool_event(index, inotify_event.dst),
+            )
+        if isinstance(inotify_event, OverflowEvent) or inotify_event.wd < 0:
+            # Overflows are not tied to a watch.
+            return inotify_event
+        return attr.evolve(
+            inotify_event, wd=inotify_event.wd * self.shard_count + index
+        )
+
+    async def _pump_shard(self, index: int, send_channel: trio.abc.SendChannel) -> None:
+        async for inotify_event in self.watchers[index]:
+            await send_channel.send(self._pool_event(index, inotify_event))
+
+    async def pump_events(self, send_channel: trio.abc.SendChannel) -> None:
+        """Read every shard concurrently and send their events into one channel.
+
+        Runs until cancelled, closing ``send_channel`` on exit::
+
+            send_channel, receive_channel = trio.open_memory_channel(1024)
+            nursery.start_soon(pool.pump_events, send_channel)
+            async for event in receive_channel:
+                print(pool.path_for_wd(event.wd), event.file_name)
+
+        Events from a single shard keep their order, events from different shards interleave.
+
+        :param trio.abc.SendChannel send_channel: Channel to deliver merged events to.
+        :return: None
+        """
+        async with send_channel:
+            async with trio.open_nursery() as nursery:
+                for index in range(self.shard_count):
+                    nursery.start_soon(self._pump_shard, index, send_channel)
+
+    def close(self) -> None:
+        """Close every shard's inotify instance.
+
+        :return: None
+        """
+        for watch_manager in self.watch_managers:
+            watch_manager.close()
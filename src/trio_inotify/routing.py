@@ -0,0 +1,267 @@
+"""Route events to the handlers registered for their paths
+"""
+import inspect
+import os
+import re
+import attr
+from enum import Flag
+from typing import Callable, Dict, Iterable, List, Optional, Pattern, Set, Union
+from trio_inotify._path_trie import PathTrie
+
+_GLOB_CHARACTERS = re.compile(r"[*?[]")
+_GLOB_TOKENS = re.compile(r"\*\*/|\*\*|\*|\?|\[!?\]?[^]]*\]")
+
+
+def _is_glob(pattern: str) -> bool:
+    return _GLOB_CHARACTERS.search(pattern) is not None
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Translate a glob pattern to an equivalent regular expression, without groups.
+
+    ``*`` and ``?`` stop at ``/``, ``**`` matches across directories and ``**/`` matches zero or
+    more leading directories.
+
+    :param str pattern: Glob pattern.
+    :return str: Regular expression matching the same strings, unanchored.
+    """
+    regex: List[str] = []
+    position = 0
+    for token in _GLOB_TOKENS.finditer(pattern):
+        regex.append(re.escape(pattern[position : token.start()]))
+        glob = token.group()
+        if glob == "**/":
+            regex.append("(?:.*/)?")
+        elif glob == "**":
+            regex.append(".*")
+        elif glob == "*":
+            regex.append("[^/]*")
+        elif glob == "?":
+            regex.append("[^/]")
+        else:
+            negate = glob.startswith("[!")
+            members = glob[2 if negate else 1 : -1].replace("\\", "\\\\")
+            regex.append("[{}{}]".format("^" if negate else "", members))
+        position = token.end()
+    regex.append(re.escape(pattern[position:]))
+    return "".join(regex)
+
+
+def _combined_regex(regexes: List[str]) -> Optional[Pattern]:
+    """Compile regexes into one, matching a string tells which of them it matched.
+
+    Each regex becomes an optional lookahead group, so a single ``match`` tries every one of
+    them at the start of the string and group ``i + 1`` is set if regex ``i`` matched.
+
+    :param list regexes: Regexes without groups of their own.
+    :return Pattern: Combined regex, ``None`` if there are no regexes.
+    """
+    if not regexes:
+        return None
+    return re.compile(
+        "".join("(?:(?=({})\\Z))?".format(regex) for regex in regexes), re.DOTALL
+    )
+
+
+def _regex_matches(
+    regex: Optional[Pattern], regex_routes: List[int], subject: str, matched: Set[int]
+) -> None:
+    """Add the routes of every regex a combined regex matched, see :py:func:`_combined_regex`.
+
+    :param Pattern regex: Combined regex, ``None`` if there are no regexes.
+    :param list regex_routes: Route index of each regex.
+    :param str subject: Path or file name to match.
+    :param set matched: Route indexes, added to.
+    :return: None
+    """
+    if regex is None:
+        return
+    match = regex.match(subject)
+    for group, index in enumerate(regex_routes, 1):
+        if match.start(group) != -1:
+            matched.add(index)
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True, eq=False)
+class Route:
+    """A handler and the events it is interested in.
+
+    Routes compare by identity, registering the same handler and pattern twice gives two
+    routes, each usable as its own subscription key (see :py:meth:`WatchManager.subscribe`).
+
+    :ivar callable handler: Called with each matching event.
+    :ivar str pattern: Glob pattern as registered, see :py:meth:`HandlerRouter.add_route`.
+    :ivar int mask: Raw inotify mask, events must have one of these bits set. ``None`` for all.
+    :ivar bool is_async: ``handler`` is a coroutine function.
+    :ivar str scope: Absolute path of the directory/file every match lies in, ``None`` if the
+        pattern can match anywhere, as relative path patterns do.
+    """
+
+    handler: Callable = attr.ib()
+    pattern: str = attr.ib()
+    mask: Optional[int] = attr.ib(default=None)
+    is_async: bool = attr.ib(default=False)
+    scope: Optional[str] = attr.ib(default=None)
+
+
+@attr.s(auto_attribs=True)
+class _PathRoutes:
+    """Routes of patterns matched against whole paths, see :py:class:`HandlerRouter`."""
+
+    paths: Dict[str, List[int]] = attr.ib(factory=dict)
+    prefixes: PathTrie = attr.ib(factory=PathTrie)
+    regexes: List[str] = attr.ib(factory=list)
+    regex_routes: List[int] = attr.ib(factory=list)
+    regex: Optional[Pattern] = attr.ib(default=None)
+
+    def __bool__(self) -> bool:
+        return bool(self.paths or self.prefixes or self.regexes)
+
+    def add(self, path_pattern: str, index: int) -> None:
+        """Register the route of a pattern.
+
+        :param str path_pattern: Glob pattern starting with ``/``.
+        :param int index: Index of the route.
+        :return: None
+        """
+        if path_pattern.endswith("/**") and not _is_glob(path_pattern[:-3]):
+            prefix = path_pattern[:-3] or "/"
+            routes = self.prefixes.get(prefix)
+            if routes is None:
+                self.prefixes[prefix] = routes = []
+            routes.append(index)
+        elif not _is_glob(path_pattern):
+            self.paths.setdefault(path_pattern, []).append(index)
+        else:
+            self.regexes.append(glob_to_regex(path_pattern))
+            self.regex_routes.append(index)
+            self.regex = _combined_regex(self.regexes)
+
+    def match(self, path: str, matched: Set[int]) -> None:
+        """Find the routes matching a path.
+
+        :param str path: Path starting with ``/``.
+        :param set matched: Route indexes, added to.
+        :return: None
+        """
+        matched.update(self.paths.get(path, ()))
+        for _, prefix_routes in self.prefixes.prefix_items(path, include_self=False):
+            matched.update(prefix_routes)
+        _regex_matches(self.regex, self.regex_routes, path, matched)
+
+
+@attr.s(auto_attribs=True)
+class HandlerRouter:
+    """Find the handlers for an event without testing every registered pattern.
+
+    Patterns are sorted into the cheapest structure able to match them:
+
+    - ``*`` and ``**`` match everything.
+    - ``*.ext`` patterns are looked up by file name suffix in a hash table.
+    - Patterns without wildcards are looked up in a hash table of file names, or of absolute
+      paths if they contain a ``/``.
+    - ``dir/**`` patterns are looked up in a trie of path prefixes.
+    - Anything else is compiled into a single regex per kind, matched once per event.
+
+    Patterns without a ``/`` match the file name alone, at any depth.  Patterns starting with
+    ``/`` match the absolute path, other patterns with a ``/`` (``tmp/**``, ``**/*.py``) match
+    the path relative to the root of the watch the event came from, see :py:meth:`route`.
+    """
+
+    routes: List[Route] = attr.ib(init=False, factory=list)
+    _match_all: List[int] = attr.ib(init=False, factory=list, repr=False)
+    _names: Dict[str, List[int]] = attr.ib(init=False, factory=dict, repr=False)
+    _extensions: Dict[str, List[int]] = attr.ib(init=False, factory=dict, repr=False)
+    _name_regexes: List[str] = attr.ib(init=False, factory=list, repr=False)
+    _name_regex_routes: List[int] = attr.ib(init=False, factory=list, repr=False)
+    _name_regex: Optional[Pattern] = attr.ib(init=False, default=None, repr=False)
+    _absolute: _PathRoutes = attr.ib(init=False, factory=_PathRoutes, repr=False)
+    # Relative path patterns, stored and matched with a leading "/".
+    _relative: _PathRoutes = attr.ib(init=False, factory=_PathRoutes, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    @property
+    def has_relative_routes(self) -> bool:
+        """Whether any route matches paths relative to the root of their watch."""
+        return bool(self._relative)
+
+    def add_route(
+        self,
+        handler: Callable,
+        pattern: str = "**",
+        event_mask: Union[Flag, int, None] = None,
+    ) -> Route:
+        """Register a handler for events on paths matching a glob pattern.
+
+        :param callable handler: Called with each matching event.
+        :param str pattern: Glob pattern, see :py:class:`HandlerRouter`.
+        :param InotifyMasks event_mask: Only route events with one of these bits set.
+        :return Route: The registered route.
+        """
+        if isinstance(event_mask, Flag):
+            event_mask = event_mask.value
+        is_async: bool = inspect.iscoroutinefunction(handler)
+        index = len(self.routes)
+        if "/" not in pattern:
+            route = Route(handler, pattern, event_mask, is_async)
+            self.routes.append(route)
+            if pattern in ("*", "**"):
+                self._match_all.append(index)
+            elif not _is_glob(pattern):
+                self._names.setdefault(pattern, []).append(index)
+            elif pattern.startswith("*.") and not _is_glob(pattern[2:]):
+                self._extensions.setdefault(pattern[2:], []).append(index)
+            else:
+                self._name_regexes.append(glob_to_regex(pattern))
+                self._name_regex_routes.append(index)
+                self._name_regex = _combined_regex(self._name_regexes)
+            return route
+        if not pattern.startswith("/"):
+            route = Route(handler, pattern, event_mask, is_async)
+            self.routes.append(route)
+            self._relative.add(os.path.normpath("/" + pattern), index)
+            return route
+        path_pattern = os.path.normpath(pattern)
+        glob_start = _GLOB_CHARACTERS.search(path_pattern)
+        if glob_start is None:
+            scope = os.path.dirname(path_pattern)
+        else:
+            scope = path_pattern[: glob_start.start()].rpartition("/")[0] or "/"
+        route = Route(handler, pattern, event_mask, is_async, scope)
+        self.routes.append(route)
+        self._absolute.add(path_pattern, index)
+        return route
+
+    def route(
+        self, path: Optional[str], mask: int, root: Optional[str] = None
+    ) -> List[Route]:
+        """Find the routes for an event.
+
+        :param str path: Absolute path of the event, ``None`` for events not tied to a path,
+            which go to every route whose mask allows them.
+        :param int mask: Raw inotify mask of the event.
+        :param str root: Absolute path of the root of the watch the event came from, relative
+            path patterns only match events with a root below it.
+        :return list: Matching routes, in the order they were added.
+        """
+        if path is None:
+            routes: Iterable[Route] = self.routes
+        else:
+            matched: Set[int] = set(self._match_all)
+            name = path.rpartition("/")[2]
+            matched.update(self._names.get(name, ()))
+            if self._extensions:
+                dot = name.find(".")
+                while dot != -1:
+                    matched.update(self._extensions.get(name[dot + 1 :], ()))
+                    dot = name.find(".", dot + 1)
+            _regex_matches(self._name_regex, self._name_regex_routes, name, matched)
+            self._absolute.match(path, matched)
+            if root is not None and self._relative:
+                root = root.rstrip("/")
+                if path.startswith(root + "/"):
+                    self._relative.match(path[len(root) :], matched)
+            routes = map(self.routes.__getitem__, sorted(matched))
+        return [route for route in routes if route.mask is None or mask & route.mask]
@@ -0,0 +1,357 @@
+"""Record the state of watched directories and work out what changed between two recordings
+"""
+import mmap
+import os
+import struct
+import attr
+import trio
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from trio_inotify._inotify_bridge import lib as inotify_lib
+
+SNAPSHOT_MAGIC = b"TINS"
+SNAPSHOT_VERSION = 1
+# Magic, format version and number of paths.
+SNAPSHOT_HEADER = struct.Struct("=4sHI")
+# Length of the path and number of entries, followed by the path.
+SNAPSHOT_PATH_HEADER = struct.Struct("=HI")
+# Inode, mtime_ns, size, is_dir and length of the name, followed by the name.
+SNAPSHOT_ENTRY = struct.Struct("=QqQBH")
+
+
+class EntryState(NamedTuple):
+    """State of a single directory entry, enough to tell whether it changed.
+
+    :ivar int inode: Inode number, a different inode under the same name is a new file.
+    :ivar int mtime_ns: Modification time in nanoseconds.
+    :ivar int size: Size in bytes.
+    :ivar bool is_dir: Entry is a directory.
+    """
+
+    inode: int
+    mtime_ns: int
+    size: int
+    is_dir: bool
+
+
+class SnapshotChange(NamedTuple):
+    """Difference between two snapshots, described as the inotify event it stands in for.
+
+    :ivar str path: Snapshotted file/directory the change was found in.
+    :ivar bytes file_name: Entry that changed, empty for a change to ``path`` itself.
+    :ivar int mask: Raw inotify event mask describing the change.
+    """
+
+    path: str
+    file_name: bytes
+    mask: int
+
+
+def _entry_state(stat_result: os.stat_result) -> EntryState:
+    return EntryState(
+        stat_result.st_ino,
+        stat_result.st_mtime_ns,
+        stat_result.st_size,
+        (stat_result.st_mode & 0o170000) == 0o040000,
+    )
+
+
+def scan_path(path: str) -> Optional[Dict[bytes, EntryState]]:
+    """Record the state of every entry in a directory.
+
+    A file is recorded as a single entry with an empty name.
+
+    :param str path: File/directory to scan.
+    :return dict: ``EntryState`` per entry name, ``None`` if ``path`` does not exist.
+    """
+    try:
+        with os.scandir(os.fsencode(path)) as directory_entries:
+            entries: Dict[bytes, EntryState] = {}
+            for directory_entry in directory_entries:
+                try:
+                    entries[directory_entry.name] = _entry_state(
+                        directory_entry.stat(follow_symlinks=False)
+                    )
+                except FileNotFoundError:
+                    continue
+            return entries
+    except NotADirectoryError:
+        try:
+            return {b"": _entry_state(os.stat(path, follow_symlinks=False))}
+        except OSError:
+            return None
+    except OSError:
+        return None
+
+
+def _diff_entries(
+    path: str,
+    previous_entries: Dict[bytes, EntryState],
+    current_entries: Dict[bytes, EntryState],
+) -> Iterable[SnapshotChange]:
+    for file_name, previous_state in previous_entries.items():
+        current_state = current_entries.get(file_name)
+        is_dir = inotify_lib.IN_ISDIR if previous_state.is_dir else 0
+        if current_state is None or current_state.inode != previous_state.inode:
+            if not file_name:
+                # The watched file itself was replaced, its watch is on the new one.
+                yield SnapshotChange(path, file_name, inotify_lib.IN_CREATE)
+                continue
+            yield SnapshotChange(path, file_name, inotify_lib.IN_DELETE | is_dir)
+            if current_state is not None:
+                yield SnapshotChange(
+                    path,
+                    file_name,
+                    inotify_lib.IN_CREATE
+                    | (inotify_lib.IN_ISDIR if current_state.is_dir else 0),
+                )
+        elif not previous_state.is_dir and (
+            current_state.mtime_ns != previous_state.mtime_ns
+            or current_state.size != previous_state.size
+        ):
+            yield SnapshotChange(path, file_name, inotify_lib.IN_MODIFY)
+    for file_name, current_state in current_entries.items():
+        if file_name not in previous_entries:
+            yield SnapshotChange(
+                path,
+                file_name,
+                inotify_lib.IN_CREATE
+                | (inotify_lib.IN_ISDIR if current_state.is_dir else 0),
+            )
+
+
+@attr.s(auto_attribs=True)
+class DirectorySnapshot:
+    """State of the entries of a set of directories at one point in time.
+
+    :ivar dict directories: Entry states of each snapshotted path, see :py:func:`scan_path`.
+    """
+
+    directories: Dict[str, Dict[bytes, EntryState]] = attr.ib(factory=dict)
+
+    @classmethod
+    def take(cls, paths: Iterable[str]) -> "DirectorySnapshot":
+        """Scan paths, blocking, so best run in a worker thread.
+
+        :param iterable paths: Files/directories to record, nonexistent ones are left out.
+        :return DirectorySnapshot: Current state of ``paths``.
+        """
+        directories: Dict[str, Dict[bytes, EntryState]] = {}
+        for path in paths:
+            entries = scan_path(path)
+            if entries is not None:
+                directories[path] = entries
+        return cls(directories)
+
+    def diff(self, current: "DirectorySnapshot") -> List[SnapshotChange]:
+        """Work out what changed between this snapshot and a later one.
+
+        Only paths present in both snapshots are compared, a path that disappeared is reported
+        by the snapshot of its parent.  Entries replaced by a different inode are reported as a
+        delete followed by a create, a snapshotted file replaced as created itself, and files
+        whose size or modification time changed as modified.
+
+        :param DirectorySnapshot current: Later snapshot, possibly of only some of the paths.
+        :return list: Changes, grouped by path.
+        """
+        changes: List[SnapshotChange] = []
+        for path, current_entries in current.directories.items():
+            previous_entries = self.directories.get(path)
+            if previous_entries is not None:
+                changes.extend(_diff_entries(path, previous_entries, current_entries))
+        return changes
+
+    def refresh(self, path: str, file_name: bytes) -> Optional[EntryState]:
+        """Bring a single entry up to date with the filesystem, blocking on one ``lstat``.
+
+        :param str path: Snapshotted path the entry is in, nothing is done for other paths.
+        :param bytes file_name: Entry to refresh, empty for the file ``path`` itself.
+        :return EntryState: Current state of the entry, ``None`` if it no longer exists or
+            was not refreshed.
+        """
+        entries = self.directories.get(path)
+        if entries is None or not (file_name or b"" in entries):
+            return None
+        entry_path = os.fsencode(path)
+        if file_name:
+            entry_path = os.path.join(entry_path, file_name)
+        try:
+            entry = _entry_state(os.stat(entry_path, follow_symlinks=False))
+        except OSError:
+            entries.pop(file_name, None)
+            return None
+        entries[file_name] = entry
+        return entry
+
+    def refresh_entries(self, stale_entries: Dict[str, Dict[bytes, int]]) -> None:
+        """Bring entries up to date with the filesystem, blocking, so best run in a worker
+        thread.
+
+        A directory created in a snapshotted one joins the snapshot empty, entries refreshed
+        for its contents then fill it in.
+
+        :param dict stale_entries: Raw masks of the events that changed each entry, by name, per
+            path, see :py:meth:`refresh`.
+        :return: None
+        """
+        for path, stale_names in stale_entries.items():
+            for file_name, mask in stale_names.items():
+                entry = self.refresh(path, file_name)
+                if entry is not None and entry.is_dir and mask & inotify_lib.IN_CREATE:
+                    self.directories.setdefault(
+                        os.path.join(path, os.fsdecode(file_name)), {}
+                    )
+
+    def save(self, snapshot_path: str) -> None:
+        """Write the snapshot to disk as packed binary records.
+
+        The file is written next to ``snapshot_path`` and renamed over it, so a crash never
+        leaves a partial snapshot behind.
+
+        :param str snapshot_path: File to write.
+        :return: None
+        """
+        records = bytearray(
+            SNAPSHOT_HEADER.pack(
+                SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(self.directories)
+            )
+        )
+        for path, entries in self.directories.items():
+            encoded_path = os.fsencode(path)
+            records += SNAPSHOT_PATH_HEADER.pack(len(encoded_path), len(entries))
+            records += encoded_path
+            for file_name, entry in entries.items():
+                records += SNAPSHOT_ENTRY.pack(
+                    entry.inode,
+                    entry.mtime_ns,
+                    entry.size,
+                    entry.is_dir,
+                    len(file_name),
+                )
+                records += file_name
+        temporary_path = "{}.{}.tmp".format(snapshot_path, os.getpid())
+        with open(temporary_path, "wb") as snapshot_file:
+            snapshot_file.write(records)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary_path, snapshot_path)
+
+    @classmethod
+    def load(cls, snapshot_path: str) -> "DirectorySnapshot":
+        """Read a snapshot written by :py:meth:`save`, memory mapping the file.
+
+        :param str snapshot_path: File to read.
+        :raises ValueError: The file is not a snapshot, or was written by another version.
+        :return DirectorySnapshot: The snapshot.
+        """
+        with open(snapshot_path, "rb") as snapshot_file:
+            if not os.fstat(snapshot_file.fileno()).st_size:
+                raise ValueError("{} is not a snapshot".format(snapshot_path))
+            with mmap.mmap(
+                snapshot_file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as records:
+                try:
+                    return cls(_unpack_snapshot(records))
+                except struct.error:
+                    raise ValueError("{} is truncated".format(snapshot_path)) from None
+
+
+def _unpack_snapshot(records: mmap.mmap) -> Dict[str, Dict[bytes, EntryState]]:
+    """Unpack the records written by :py:meth:`DirectorySnapshot.save`.
+
+    :param mmap records: Contents of a snapshot file.
+    :raises ValueError: Not a snapshot, or written by another version.
+    :return dict: Entry states of each path.
+    """
+    magic, version, path_count = SNAPSHOT_HEADER.unpack_from(records, 0)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError("Unsupported snapshot format")
+    unpack_path_header = SNAPSHOT_PATH_HEADER.unpack_from
+    unpack_entry = SNAPSHOT_ENTRY.unpack_from
+    path_header_size: int = SNAPSHOT_PATH_HEADER.size
+    entry_size: int = SNAPSHOT_ENTRY.size
+    directories: Dict[str, Dict[bytes, EntryState]] = {}
+    i: int = SNAPSHOT_HEADER.size
+    for _ in range(path_count):
+        path_length, entry_count = unpack_path_header(records, i)
+        i += path_header_size
+        path = os.fsdecode(records[i : i + path_length])
+        i += path_length
+        entries: Dict[bytes, EntryState] = {}
+        for _ in range(entry_count):
+            inode, mtime_ns, size, is_dir, name_length = unpack_entry(records, i)
+            i += entry_size
+            entries[records[i : i + name_length]] = EntryState(
+                inode, mtime_ns, size, bool(is_dir)
+            )
+            i += name_length
+        directories[path] = entries
+    if i != len(records):
+        raise ValueError("Trailing data after snapshot")
+    return directories
+
+
+async def take_snapshot(
+    paths: Iterable[str], max_workers: int = 8, chunk_size: int = 256
+) -> DirectorySnapshot:
+    """Snapshot paths from inside a trio task, scanning in parallel worker threads.
+
+    :param iterable paths: Files/directories to record, nonexistent ones are left out.
+    :param int max_workers: Largest number of threads scanning at once.
+    :param int chunk_size: Paths scanned per thread.
+    :return DirectorySnapshot: Current state of ``paths``.
+    """
+    paths = list(paths)
+    limiter = trio.CapacityLimiter(max_workers)
+    snapshot = DirectorySnapshot()
+
+    async def scan(chunk: List[str]) -> None:
+        chunk_snapshot = await trio.to_thread.run_sync(
+            DirectorySnapshot.take, chunk, limiter=limiter
+        )
+        snapshot.directories.update(chunk_snapshot.directories)
+
+    async with trio.open_nursery() as nursery:
+        for start in range(0, len(paths), chunk_size):
+            nursery.start_soon(scan, paths[start : start + chunk_size])
+    return snapshot
+
+
+async def diff_snapshot(
+    previous: DirectorySnapshot,
+    paths: Iterable[str],
+    max_workers: int = 8,
+    chunk_size: int = 256,
+) -> Tuple[DirectorySnapshot, List[SnapshotChange]]:
+    """Scan paths in parallel worker threads, each diffing its share against ``previous``.
+
+    :param DirectorySnapshot previous: Snapshot to compare against.
+    :param iterable paths: Files/directories to scan.
+    :param int max_workers: Largest number of threads scanning at once.
+    :param int chunk_size: Paths scanned per thread.
+    :return tuple: Current ``DirectorySnapshot`` of ``paths`` and the list of
+        :py:class:`SnapshotChange`, grouped by path.
+    """
+    paths = list(paths)
+    limiter = trio.CapacityLimiter(max_workers)
+    snapshot = DirectorySnapshot()
+    chunk_changes: List[List[SnapshotChange]] = []
+
+    def scan_and_diff(
+        chunk: List[str],
+    ) -> Tuple[DirectorySnapshot, List[SnapshotChange]]:
+        chunk_snapshot = DirectorySnapshot.take(chunk)
+        return chunk_snapshot, previous.diff(chunk_snapshot)
+
+    async def scan(index: int, chunk: List[str]) -> None:
+        chunk_snapshot, chunk_changes[index] = await trio.to_thread.run_sync(
+            scan_and_diff, chunk, limiter=limiter
+        )
+        snapshot.directories.update(chunk_snapshot.directories)
+
+    async with trio.open_nursery() as nursery:
+        for start in range(0, len(paths), chunk_size):
+            chunk_changes.append([])
+            nursery.start_soon(
+                scan, len(chunk_changes) - 1, paths[start : start + chunk_size]
+            )
+    return snapshot, [change for changes in chunk_changes for change in changes]
@@ -0,0 +1,97 @@
+import errno
+import os
+import pytest
+import trio
+from trio_inotify.budget import WatchBudget
+from trio_inotify.inotify import WatchManager
+
+
+def make_trees(tmp_path, *names, size=2):
+    paths = []
+    for name in names:
+        for index in range(size - 1):
+            os.makedirs(tmp_path / name / str(index))
+        paths.append(str(tmp_path / name))
+    return paths
+
+
+def test_evicts_lower_priority_least_recently_active_first(tmp_path):
+    idle, busy, important = make_trees(tmp_path, "idle", "busy", "important")
+    with WatchManager() as watch_manager:
+        budget = WatchBudget(limit=4, headroom=0, external_usage=0)
+        idle_watch = budget.add_watch(watch_manager, idle, recursive=True)
+        busy_watch = budget.add_watch(watch_manager, busy, recursive=True)
+        busy_watch.last_activity += 1
+        assert budget.available == 0
+        important_watch = budget.add_watch(
+            watch_manager, important, recursive=True, priority=1
+        )
+        assert idle_watch.polling
+        assert not busy_watch.polling
+        assert not important_watch.polling
+        assert idle not in watch_manager._watches
+        assert watch_manager.watch_count() == 4
+        assert budget.available == 0
+
+
+def test_nested_watches_are_counted_once(tmp_path):
+    (tree,) = make_trees(tmp_path, "tree", size=3)
+    with WatchManager() as watch_manager:
+        budget = WatchBudget(limit=3, headroom=0, external_usage=0)
+        budget.add_watch(watch_manager, tree, recursive=True)
+        nested_watch = budget.add_watch(watch_manager, os.path.join(tree, "0"))
+        assert not nested_watch.polling
+        assert budget.used == 3
+
+
+def test_no_room_without_polling(tmp_path):
+    low, high, new = make_trees(tmp_path, "low", "high", "new")
+    with WatchManager() as watch_manager:
+        budget = WatchBudget(
+            limit=4, headroom=0, external_usage=0, degrade_to_polling=False
+        )
+        budget.add_watch(watch_manager, low, recursive=True)
+        budget.add_watch(watch_manager, high, recursive=True, priority=2)
+        budget.add_watch(watch_manager, new, recursive=True, priority=1)
+        # The low priority watch is dropped, not polled.
+        assert low not in budget.watches
+        with pytest.raises(OSError) as error:
+            budget.add_watch(watch_manager, low, recursive=True)
+        assert error.value.errno == errno.ENOSPC
+        assert low not in budget.watches
+        assert watch_manager.watch_count() == 4
+
+
+def test_polled_watch_reports_changes_and_is_restored(tmp_path):
+    high, low = make_trees(tmp_path, "high", "low")
+
+    async def main():
+        with WatchManager() as watch_manager:
+            budget = WatchBudget(
+                limit=2, headroom=0, external_usage=0, poll_interval=0.05
+            )
+            budget.add_watch(watch_manager, high, recursive=True, priority=1)
+            low_watch = budget.add_watch(watch_manager, low, recursive=True)
+            assert low_watch.polling
+            send_channel, receive_channel = trio.open_memory_channel(100)
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(budget.poll, send_channel)
+                await trio.sleep(0.1)
+                with open(os.path.join(low, "0", "file"), "w"):
+                    pass
+                with trio.fail_after(5):
+                    event = await receive_channel.receive()
+                assert event.is_create
+                assert event.wd == -1
+                assert event.path == os.path.join(low, "0", "file")
+                budget.del_watch(high)
+                with trio.fail_after(5):
+                    while low_watch.polling:
+                        await trio.sleep(0.05)
+                nursery.cancel_scope.cancel()
+            assert watch_manager.watch_covering(os.path.join(low, "0")) == os.path.join(
+                low, "0"
+            )
+            assert high not in watch_manager._watches
+
+    trio.run(main)
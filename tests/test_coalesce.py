@@ -0,0 +1,29 @@
+import os
+import trio
+from trio_inotify.inotify import MoveEvent, WatchManager, Watcher
+
+
+def test_name_recreated_after_move_is_not_merged_into_earlier_event(tmp_path):
+    async def main():
+        with WatchManager() as watch_manager:
+            watch_manager.add_watch(str(tmp_path))
+            watcher = Watcher(
+                watch_manager=watch_manager, pair_moves=True, coalesce_window=0.2
+            )
+            (tmp_path / "f").write_text("old")
+            os.rename(tmp_path / "f", tmp_path / "g")
+            (tmp_path / "f").write_text("new")
+            events = await watcher.get_inotify_event()
+            moves = [
+                index
+                for index, event in enumerate(events)
+                if isinstance(event, MoveEvent)
+            ]
+            assert len(moves) == 1
+            assert [
+                event
+                for event in events[moves[0] + 1 :]
+                if event.file_name == b"f" and event.is_create
+            ]
+
+    trio.run(main)
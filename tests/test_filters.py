@@ -0,0 +1,67 @@
+import os
+import trio
+from trio_inotify._inotify_bridge import lib as inotify_lib
+from trio_inotify.filters import EventFilter
+from trio_inotify.inotify import InotifyMasks, WatchManager, Watcher
+
+
+def rejects(event_filter, mask, name=b"", wd=1, paths=None):
+    buffer = b"header" + name + b"\0\0"
+    return event_filter.rejects(
+        wd, mask, buffer, 6, 6 + len(name), paths or {1: "/srv/app"}
+    )
+
+
+def test_rejects_events_outside_mask():
+    event_filter = EventFilter(InotifyMasks.IN_CREATE | InotifyMasks.IN_DELETE)
+    assert not rejects(event_filter, inotify_lib.IN_CREATE, b"file")
+    assert rejects(event_filter, inotify_lib.IN_MODIFY, b"file")
+
+
+def test_rejects_excluded_names():
+    event_filter = EventFilter(exclude_names=["*.swp", "~*"])
+    assert rejects(event_filter, inotify_lib.IN_MODIFY, b".file.swp")
+    assert rejects(event_filter, inotify_lib.IN_MODIFY, b"~lock")
+    assert not rejects(event_filter, inotify_lib.IN_MODIFY, b"file.swpx")
+    assert not rejects(event_filter, inotify_lib.IN_DELETE_SELF)
+
+
+def test_rejects_excluded_directories_and_below():
+    event_filter = EventFilter(exclude_directories=[".git"])
+    paths = {1: "/srv/app", 2: "/srv/app/.git", 3: "/srv/app/.git/objects"}
+    assert rejects(event_filter, inotify_lib.IN_CREATE | inotify_lib.IN_ISDIR, b".git")
+    assert not rejects(event_filter, inotify_lib.IN_CREATE, b"file", 1, paths)
+    assert rejects(event_filter, inotify_lib.IN_CREATE, b"file", 2, paths)
+    assert rejects(event_filter, inotify_lib.IN_CREATE, b"file", 3, paths)
+    # A reused watch descriptor is judged by its new path.
+    paths[2] = "/srv/app/src"
+    assert not rejects(event_filter, inotify_lib.IN_CREATE, b"file", 2, paths)
+
+
+def test_watcher_skips_rejected_events(tmp_path):
+    os.mkdir(tmp_path / ".git")
+
+    async def main():
+        with WatchManager() as watch_manager:
+            event_filter = EventFilter(
+                InotifyMasks.IN_CREATE,
+                exclude_names=["*.swp"],
+                exclude_directories=[".git"],
+            )
+            with Watcher(
+                watch_manager=watch_manager, event_filter=event_filter
+            ) as watcher:
+                watch_manager.add_watch(str(tmp_path), recursive=True)
+                (tmp_path / "kept").write_text("contents")
+                (tmp_path / "kept.swp").touch()
+                (tmp_path / ".git" / "index").touch()
+                events = []
+                with trio.move_on_after(0.2):
+                    while True:
+                        events.extend(await watcher.get_inotify_event())
+                assert [(event.file_name, event.is_create) for event in events] == [
+                    (b"kept", True)
+                ]
+            assert not watch_manager._subscriptions
+
+    trio.run(main)
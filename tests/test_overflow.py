@@ -0,0 +1,70 @@
+import os
+import trio
+from trio_inotify.inotify import (
+    OverflowEvent,
+    WatchManager,
+    Watcher,
+    max_queued_events,
+)
+
+
+def test_rescan_scans_do_not_overflow_the_queue(tmp_path):
+    # Reading a directory queues six events, enough directories overflow on one scan.
+    for index in range(max_queued_events() // 6 + 100):
+        os.mkdir(tmp_path / str(index))
+
+    async def main():
+        with WatchManager() as watch_manager:
+            with Watcher(
+                watch_manager=watch_manager, overflow_policy="rescan"
+            ) as watcher:
+                # Watches added from here on leave out what the walk's reads queue too.
+                watch_manager.add_watch(str(tmp_path), recursive=True)
+                events = []
+                with trio.move_on_after(1):
+                    async for event in watcher.events():
+                        events.append(event)
+                        if isinstance(event, OverflowEvent):
+                            break
+                assert events == []
+                await watcher._rescan_watches()
+                with trio.move_on_after(0.5):
+                    events = await watcher.get_inotify_event()
+                assert events == []
+
+    trio.run(main)
+
+
+def test_rescan_reports_only_lost_changes(tmp_path):
+    async def main():
+        with WatchManager() as watch_manager:
+            watch_manager.add_watch(str(tmp_path), recursive=True)
+            with Watcher(
+                watch_manager=watch_manager, overflow_policy="rescan"
+            ) as watcher:
+                with trio.move_on_after(0.2):
+                    await watcher.get_inotify_event()
+                os.mkdir(tmp_path / "delivered")
+                (tmp_path / "delivered" / "file").touch()
+                with trio.move_on_after(0.2):
+                    while True:
+                        await watcher.get_inotify_event()
+                (tmp_path / "lost").touch()
+                (tmp_path / "delivered" / "lost").touch()
+                # As if the kernel queue overflowed.
+                watcher._read_inotify_fd()
+                events = await watcher._rescan_watches()
+                assert sorted(
+                    (event.wd, event.file_name, event.is_create) for event in events
+                ) == sorted(
+                    [
+                        (watch_manager._watches[str(tmp_path)], b"lost", True),
+                        (
+                            watch_manager._watches[str(tmp_path / "delivered")],
+                            b"lost",
+                            True,
+                        ),
+                    ]
+                )
+
+    trio.run(main)
@@ -0,0 +1,87 @@
+import pytest
+from trio_inotify._path_trie import PathTrie
+
+
+@pytest.fixture
+def trie():
+    return PathTrie(
+        {"/srv": 1, "/srv/app": 2, "/srv/app/src": 3, "/srv/application": 4}
+    )
+
+
+def test_mapping_operations(trie):
+    assert len(trie) == 4
+    assert trie["/srv/app"] == 2
+    assert "/srv/app" in trie
+    assert "/srv/ap" not in trie
+    assert "/srv/app/src/pkg" not in trie
+    assert 1 not in trie
+    trie["/srv/app"] = 5
+    assert trie["/srv/app"] == 5
+    assert len(trie) == 4
+    del trie["/srv/app"]
+    assert "/srv/app" not in trie
+    assert trie["/srv/app/src"] == 3
+    assert len(trie) == 3
+    assert sorted(trie) == ["/srv", "/srv/app/src", "/srv/application"]
+    with pytest.raises(KeyError):
+        trie["/srv/app"]
+    with pytest.raises(KeyError):
+        del trie["/srv/app"]
+    with pytest.raises(KeyError):
+        del trie["/missing/path"]
+
+
+def test_deleting_last_key_below_prunes_nodes(trie):
+    del trie["/srv/app/src"]
+    del trie["/srv/app"]
+    assert "app" not in trie._root.children["srv"].children
+    assert trie.subtree_size("/srv") == 2
+
+
+def test_subtree_items(trie):
+    assert sorted(trie.subtree_items("/srv/app")) == [
+        ("/srv/app", 2),
+        ("/srv/app/src", 3),
+    ]
+    assert trie.subtree_items("/srv/app", include_self=False) == [("/srv/app/src", 3)]
+    assert trie.subtree_items("/srv/app/src/pkg") == []
+    assert len(trie.subtree_items("/")) == 4
+
+
+def test_subtree_size(trie):
+    assert trie.subtree_size("/") == 4
+    assert trie.subtree_size("/srv") == 4
+    assert trie.subtree_size("/srv/app") == 2
+    assert trie.subtree_size("/srv/app/src/pkg") == 0
+    trie["/srv/app/src/pkg"] = 6
+    assert trie.subtree_size("/srv/app") == 3
+
+
+def test_prefix_items(trie):
+    assert trie.prefix_items("/srv/app/src/pkg/module.py") == [
+        ("/srv", 1),
+        ("/srv/app", 2),
+        ("/srv/app/src", 3),
+    ]
+    assert trie.prefix_items("/srv/app/src", include_self=False) == [
+        ("/srv", 1),
+        ("/srv/app", 2),
+    ]
+    assert trie.prefix_items("/", include_self=False) == []
+    assert trie.prefix_items("/opt") == []
+
+
+def test_longest_prefix_item(trie):
+    assert trie.longest_prefix_item("/srv/app/src/pkg") == ("/srv/app/src", 3)
+    assert trie.longest_prefix_item("/srv/app") == ("/srv/app", 2)
+    assert trie.longest_prefix_item("/srv/apple") == ("/srv", 1)
+    assert trie.longest_prefix_item("/opt") is None
+    trie["/"] = 0
+    assert trie.longest_prefix_item("/opt") == ("/", 0)
+
+
+def test_clear(trie):
+    trie.clear()
+    assert len(trie) == 0
+    assert trie.longest_prefix_item("/srv/app") is None
@@ -0,0 +1,186 @@
+import errno
+import os
+import pytest
+import trio
+from trio_inotify import inotify
+from trio_inotify.inotify import (
+    MAX_INOTIFY_EVENT_SIZE,
+    InotifyMasks,
+    RecursiveWatch,
+    WatchManager,
+    Watcher,
+)
+
+
+async def read_events(watcher: Watcher, timeout: float = 0.2) -> list:
+    events = []
+    with trio.move_on_after(timeout):
+        while True:
+            events.extend(await watcher.get_inotify_event())
+    return events
+
+
+def test_directory_created_before_parent_moved_is_watched(tmp_path):
+    os.mkdir(tmp_path / "a")
+
+    async def main():
+        with WatchManager() as watch_manager:
+            watch_manager.add_watch(str(tmp_path), recursive=True)
+            watcher = Watcher(watch_manager=watch_manager, resolve_paths=True)
+            # Both happen before the IN_CREATE for a/b is read, so a/b no longer exists then.
+            os.mkdir(tmp_path / "a" / "b")
+            os.rename(tmp_path / "a", tmp_path / "c")
+            await read_events(watcher)
+            assert watch_manager.watch_covering(str(tmp_path / "c" / "b")) == str(
+                tmp_path / "c" / "b"
+            )
+            (tmp_path / "c" / "b" / "file").touch()
+            events = await read_events(watcher)
+            assert str(tmp_path / "c" / "b" / "file") in [
+                event.path for event in events
+            ]
+
+    trio.run(main)
+
+
+def test_add_watch_recursive_raises_one_error_when_walkers_fail(tmp_path, monkeypatch):
+    for name in "abcd":
+        os.makedirs(tmp_path / name / "sub")
+
+    add_watches = inotify.inotify_add_watches
+    calls = []
+
+    def out_of_watches(inotify_fd, paths, watch_mask):
+        # Watch the first level, so several walkers fail on the next.
+        calls.append(paths)
+        if len(calls) == 1:
+            return add_watches(inotify_fd, paths, watch_mask)
+        return [-1] * len(paths), [errno.ENOSPC] * len(paths)
+
+    async def main():
+        with WatchManager() as watch_manager:
+            monkeypatch.setattr(inotify, "inotify_add_watches", out_of_watches)
+            with pytest.raises(OSError) as error_info:
+                await watch_manager.add_watch_recursive(str(tmp_path), chunk_size=1)
+            assert error_info.value.errno == errno.ENOSPC
+            assert watch_manager.watch_count() == 0
+
+    trio.run(main)
+
+
+def test_directory_with_undecodable_name_is_watched(tmp_path):
+    async def main():
+        with WatchManager() as watch_manager:
+            watch_manager.add_watch(str(tmp_path), recursive=True)
+            watcher = Watcher(watch_manager=watch_manager, resolve_paths=True)
+            directory = os.path.join(os.fsencode(tmp_path), b"bad\xff")
+            os.mkdir(directory)
+            await read_events(watcher)
+            open(os.path.join(directory, b"file"), "w").close()
+            events = await read_events(watcher)
+            assert os.fsdecode(os.path.join(directory, b"file")) in [
+                event.path for event in events
+            ]
+
+    trio.run(main)
+
+
+def test_rename_split_across_reads_keeps_watches(tmp_path):
+    os.makedirs(tmp_path / "sub")
+    (tmp_path / "sub" / "x").touch()
+
+    async def main():
+        with WatchManager() as watch_manager:
+            watch_manager.add_watch(str(tmp_path), recursive=True)
+            # Room for one event per read, so the move's two halves are read separately.
+            watcher = Watcher(
+                watch_manager=watch_manager,
+                reuse_buffer=True,
+                read_buffer_size=MAX_INOTIFY_EVENT_SIZE,
+                resolve_paths=True,
+            )
+            os.rename(tmp_path / "sub", tmp_path / "moved")
+            events = await read_events(watcher)
+            assert not [event for event in events if event.is_create]
+            assert None not in [event.path for event in events]
+            assert watch_manager.watch_covering(str(tmp_path / "moved")) == str(
+                tmp_path / "moved"
+            )
+
+    trio.run(main)
+
+
+def test_directory_moved_out_is_unwatched(tmp_path):
+    os.makedirs(tmp_path / "watched" / "sub")
+
+    async def main():
+        with WatchManager() as watch_manager:
+            watch_manager.add_watch(str(tmp_path / "watched"), recursive=True)
+            watcher = Watcher(watch_manager=watch_manager)
+            os.rename(tmp_path / "watched" / "sub", tmp_path / "outside")
+            await read_events(watcher)
+            (tmp_path / "outside" / "file").touch()
+            await read_events(watcher)
+            assert watch_manager.watch_count() == 1
+
+    trio.run(main)
+
+
+@pytest.mark.parametrize(
+    "path, pruned",
+    [
+        ("/w", False),
+        ("/w/src", False),
+        ("/w/src/pkg", False),
+        ("/w/src/pkg/deep", True),
+        ("/w/node_modules", True),
+        ("/w/src/node_modules", True),
+        ("/w/build", False),
+        ("/w/build/out", True),
+        ("/w/src/build", False),
+    ],
+)
+def test_recursive_watch_prunes(path, pruned):
+    recursive_watch = RecursiveWatch(
+        InotifyMasks.IN_CREATE, exclude=["node_modules", "build/*"], max_depth=2
+    )
+    assert recursive_watch.prunes("/w", path) is pruned
+
+
+def test_directory_renamed_into_excluded_name_is_unwatched(tmp_path):
+    os.makedirs(tmp_path / "lib" / "sub")
+
+    async def main():
+        with WatchManager() as watch_manager:
+            watch_manager.add_watch(
+                str(tmp_path), recursive=True, exclude=["node_modules"]
+            )
+            watcher = Watcher(watch_manager=watch_manager)
+            assert watch_manager.watch_count() == 3
+            os.rename(tmp_path / "lib", tmp_path / "node_modules")
+            await read_events(watcher)
+            assert watch_manager.watch_count() == 1
+            assert watch_manager.watch_covering(
+                str(tmp_path / "node_modules" / "sub")
+            ) == str(tmp_path)
+
+    trio.run(main)
+
+
+def test_directory_renamed_deeper_drops_watches_past_max_depth(tmp_path):
+    os.makedirs(tmp_path / "a" / "b")
+    os.makedirs(tmp_path / "c")
+
+    async def main():
+        with WatchManager() as watch_manager:
+            watch_manager.add_watch(str(tmp_path), recursive=True, max_depth=2)
+            watcher = Watcher(watch_manager=watch_manager)
+            assert watch_manager.watch_count() == 4
+            os.rename(tmp_path / "a", tmp_path / "c" / "a")
+            await read_events(watcher)
+            assert watch_manager.watch_covering(str(tmp_path / "c" / "a" / "b")) == str(
+                tmp_path / "c" / "a"
+            )
+            assert watch_manager.watch_count() == 3
+
+    trio.run(main)
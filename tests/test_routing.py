@@ -0,0 +1,91 @@
+import re
+import pytest
+from trio_inotify._inotify_bridge import lib as inotify_lib
+from trio_inotify.inotify import InotifyEvent, WatchManager, Watcher
+from trio_inotify.routing import HandlerRouter, glob_to_regex
+
+
+@pytest.mark.parametrize(
+    "pattern, matches, misses",
+    [
+        ("*.log", ["a.log", ".log"], ["a/b.log", "a.logs"]),
+        ("data_??.csv", ["data_01.csv"], ["data_1.csv", "data_001.csv"]),
+        ("/srv/**", ["/srv/a", "/srv/a/b"], ["/srv", "/srvx/a"]),
+        ("/srv/**/*.py", ["/srv/a.py", "/srv/a/b/c.py"], ["/srv/a.pyc"]),
+        ("[!a]*", ["b", "ba"], ["a", "ab"]),
+        ("[a-c]x", ["ax", "cx"], ["dx"]),
+        ("a+b(c)", ["a+b(c)"], ["aab(c)"]),
+    ],
+)
+def test_glob_to_regex(pattern, matches, misses):
+    regex = re.compile(glob_to_regex(pattern) + r"\Z")
+    for subject in matches:
+        assert regex.match(subject), subject
+    for subject in misses:
+        assert not regex.match(subject), subject
+
+
+def handler(event):
+    pass
+
+
+@pytest.fixture
+def router():
+    router = HandlerRouter()
+    for pattern in (
+        "**",
+        "*.log",
+        "access.log",
+        "data_*.csv",
+        "/srv/app/**",
+        "/srv/app/config.yml",
+        "/srv/*/error.log",
+        "tmp/**",
+        "**/*.py",
+    ):
+        router.add_route(handler, pattern)
+    return router
+
+
+@pytest.mark.parametrize(
+    "path, root, patterns",
+    [
+        ("/var/log/access.log", "/var", ["**", "*.log", "access.log"]),
+        ("/var/data_1.csv", "/var", ["**", "data_*.csv"]),
+        ("/srv/app/config.yml", "/srv", ["**", "/srv/app/**", "/srv/app/config.yml"]),
+        ("/srv/web/error.log", None, ["**", "*.log", "/srv/*/error.log"]),
+        ("/project/tmp/a/b", "/project", ["**", "tmp/**"]),
+        ("/project/src/tmp/a", "/project", ["**"]),
+        ("/project/main.py", "/project", ["**", "**/*.py"]),
+        ("/project/src/main.py", "/project", ["**", "**/*.py"]),
+        ("/project/src/main.py", None, ["**"]),
+    ],
+)
+def test_route_matches_patterns(router, path, root, patterns):
+    routes = router.route(path, inotify_lib.IN_MODIFY, root)
+    assert [route.pattern for route in routes] == patterns
+
+
+def test_route_filters_on_mask():
+    router = HandlerRouter()
+    router.add_route(handler, "*.log", inotify_lib.IN_CLOSE_WRITE)
+    router.add_route(handler, "*.log")
+    assert len(router.route("/a.log", inotify_lib.IN_MODIFY)) == 1
+    assert len(router.route("/a.log", inotify_lib.IN_CLOSE_WRITE)) == 2
+    assert len(router.route(None, inotify_lib.IN_Q_OVERFLOW)) == 1
+
+
+def test_relative_patterns_match_from_watch_root(tmp_path, monkeypatch):
+    (tmp_path / "tmp").mkdir()
+    # Relative patterns must not depend on the working directory.
+    monkeypatch.chdir("/")
+    with WatchManager() as watch_manager:
+        watch_manager.add_watch(str(tmp_path), recursive=True)
+        watcher = Watcher(watch_manager=watch_manager)
+        watcher.add_handler(handler, "tmp/**")
+        wd = watch_manager._watches[str(tmp_path / "tmp")]
+        routes = watcher._route_event(InotifyEvent(wd, inotify_lib.IN_CREATE, 0, b"x"))
+        assert [route.pattern for route in routes] == ["tmp/**"]
+        wd = watch_manager._watches[str(tmp_path)]
+        routes = watcher._route_event(InotifyEvent(wd, inotify_lib.IN_CREATE, 0, b"x"))
+        assert routes == []
@@ -0,0 +1,104 @@
+import os
+import pytest
+import trio
+from trio_inotify._inotify_bridge import lib as inotify_lib
+from trio_inotify.inotify import WatchManager, Watcher
+from trio_inotify.snapshot import DirectorySnapshot
+
+
+def test_save_and_load_round_trip(tmp_path):
+    (tmp_path / "file").write_text("contents")
+    os.mkdir(tmp_path / "directory")
+    os.mkdir(tmp_path / "bad\udcff")
+    snapshot = DirectorySnapshot.take(
+        [str(tmp_path), str(tmp_path / "file"), str(tmp_path / "missing")]
+    )
+    snapshot_path = str(tmp_path / "snapshot")
+    snapshot.save(snapshot_path)
+    assert DirectorySnapshot.load(snapshot_path) == snapshot
+    assert str(tmp_path / "missing") not in snapshot.directories
+    assert set(snapshot.directories[str(tmp_path)]) == {
+        b"file",
+        b"directory",
+        b"bad\xff",
+    }
+
+
+def test_load_rejects_other_files(tmp_path):
+    (tmp_path / "empty").touch()
+    (tmp_path / "other").write_bytes(b"not a snapshot at all")
+    for name in ("empty", "other"):
+        with pytest.raises(ValueError):
+            DirectorySnapshot.load(str(tmp_path / name))
+
+
+def test_diff_reports_changes(tmp_path):
+    (tmp_path / "modified").write_text("old")
+    (tmp_path / "deleted").touch()
+    (tmp_path / "replaced").touch()
+    (tmp_path / "unchanged").touch()
+    previous = DirectorySnapshot.take([str(tmp_path)])
+    (tmp_path / "modified").write_text("new contents")
+    os.remove(tmp_path / "deleted")
+    os.remove(tmp_path / "replaced")
+    (tmp_path / "replaced").touch()
+    os.mkdir(tmp_path / "created")
+    changes = previous.diff(DirectorySnapshot.take([str(tmp_path)]))
+    assert sorted((file_name, mask) for _, file_name, mask in changes) == sorted(
+        [
+            (b"modified", inotify_lib.IN_MODIFY),
+            (b"deleted", inotify_lib.IN_DELETE),
+            (b"replaced", inotify_lib.IN_DELETE),
+            (b"replaced", inotify_lib.IN_CREATE),
+            (b"created", inotify_lib.IN_CREATE | inotify_lib.IN_ISDIR),
+        ]
+    )
+
+
+def catch_up_events(tmp_path, watched_path, change):
+    snapshot_path = str(tmp_path / "snapshot")
+
+    async def main():
+        with WatchManager() as watch_manager:
+            watch_manager.add_watch(watched_path, recursive=os.path.isdir(watched_path))
+            await Watcher(watch_manager=watch_manager).save_snapshot(snapshot_path)
+        change()
+        with WatchManager() as watch_manager:
+            watch_manager.add_watch(watched_path, recursive=os.path.isdir(watched_path))
+            watcher = Watcher(watch_manager=watch_manager, resolve_paths=True)
+            await watcher.catch_up(snapshot_path)
+            events = await watcher.get_inotify_event()
+            return watch_manager, events
+
+    return trio.run(main)
+
+
+def test_catch_up_reports_contents_of_created_directories(tmp_path):
+    os.mkdir(tmp_path / "watched")
+
+    def change():
+        os.makedirs(tmp_path / "watched" / "new" / "deeper")
+        (tmp_path / "watched" / "new" / "deeper" / "file").touch()
+
+    _, events = catch_up_events(tmp_path, str(tmp_path / "watched"), change)
+    assert [os.path.relpath(event.path, tmp_path) for event in events] == [
+        "watched/new",
+        "watched/new/deeper",
+        "watched/new/deeper/file",
+    ]
+
+
+def test_catch_up_keeps_watch_on_replaced_file(tmp_path):
+    watched_file = tmp_path / "watched"
+    watched_file.touch()
+
+    def change():
+        # Renamed rather than deleted, so the replacement cannot reuse its inode.
+        os.rename(watched_file, tmp_path / "old")
+        watched_file.write_text("replacement")
+
+    watch_manager, events = catch_up_events(tmp_path, str(watched_file), change)
+    assert [(event.path, event.is_create) for event in events] == [
+        (str(watched_file), True)
+    ]
+    assert watch_manager.reaped_watches == 0